@@ -1,12 +1,107 @@
+import time
+IMPORT_STARTED = time.perf_counter()
 import sys
 import os
+import json
+import re
 from PyQt5.QtWidgets import (QApplication, QDialog, QMainWindow, QShortcut, QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QLabel, 
                              QPushButton, QComboBox, QCheckBox, QSplitter, QLineEdit, QToolBar, QAction, 
-                             QFileDialog, QPlainTextEdit, QToolTip, QFrame)
-from PyQt5.QtGui import QColor, QKeySequence, QPainter, QTextCharFormat, QFont, QSyntaxHighlighter, QTextCursor, QPalette, QIcon, QTextFormat, QMouseEvent
-from PyQt5.QtCore import QRect, QSize, Qt, QRegExp, QThread, pyqtSignal, QRunnable, QObject, QThreadPool, QPoint
-from transformers import AutoTokenizer
+                             QFileDialog, QPlainTextEdit, QToolTip, QFrame, QAbstractScrollArea, QStackedWidget,
+                             QListWidget, QListWidgetItem, QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtGui import QColor, QKeySequence, QPainter, QTextCharFormat, QFont, QSyntaxHighlighter, QTextCursor, QPalette, QIcon, QTextFormat, QMouseEvent, QStaticText
+from PyQt5.QtCore import QEvent, QRect, QSize, Qt, QRegExp, QThread, pyqtSignal, QRunnable, QObject, QThreadPool, QPoint, QTimer
 import random
+from html import escape
+# Tokenizers load on a loader thread; transformers is only imported for models without a tokenizer.json
+from tokenz import (DISPLAY_TABLE, WINDOW_SIZE, MappedText, ResultCache, TokenBuffer, TokenCells,
+                    TokenIndex, TokenizerCache, TokenLayout, Utf16Offsets, aligned_segments, cached_tokenize, compare_results, count_stream,
+                    find_all, iter_pieces, line_starts, read_document, recount_edits, replace_all, retokenize_edits, special_tokens, token_stats,
+                    tokenize_stream, edit_from_utf16, tokenizer_fingerprint, traced, tracer, write_document)
+IMPORTS_DONE = time.perf_counter()
+
+# Results with more tokens than this are drawn by the virtualized TokenView
+VIRTUAL_VIEW_TOKENS = 20000
+# "Randomize" cycles through this many seeded colors
+RANDOM_PALETTE_SIZE = 256
+# Loaded tokenizers kept around for instant model switching
+TOKENIZER_CACHE_SIZE = 5
+# Live updates re-tokenize edits up to this size in place; bigger ones (paste, open) go to a full job
+INCREMENTAL_EDIT_LIMIT = 65536
+# Idle time after the last edit before the visualization and word count are refreshed
+LIVE_REFRESH_MS = 250
+# Hover lookups are coalesced to at most one per frame
+HOVER_INTERVAL_MS = 16
+# Running jobs report progress and the tokens so far at most this often
+PARTIAL_INTERVAL_MS = 100
+# Characters sent to the tokenization server per request, so its jobs report progress and can stop too
+SERVER_PIECE_CHARS = 1 << 18
+# Files at least this big are memory-mapped and shown read-only a page at a time
+LARGE_FILE_BYTES = 32 * 1024 * 1024
+# Lines per editor page in large-file mode, capped to PAGE_CHARS characters
+PAGE_LINES = 2000
+PAGE_CHARS = 1 << 20
+# How much of the text the comparison dialog lays out side by side
+COMPARE_PREVIEW_CHARS = 2000
+# Refresh interval of the pipeline timing overlay (Ctrl+Shift+P)
+TRACE_OVERLAY_MS = 500
+# Find All highlights at most this many matches in the editor's viewport at a time
+VISIBLE_MATCH_LIMIT = 5000
+# Laid-out line numbers kept by the editor gutter; a few screens' worth
+LINE_NUMBER_CACHE_SIZE = 4096
+
+class StartupTimer:
+    # Milliseconds spent in each startup phase, printed once the first tokenizer is ready.
+    # Set TOKENZ_STARTUP_REPORT to a path to also write the report there as JSON.
+    def __init__(self, started=IMPORT_STARTED):
+        self.started = started
+        self.marks = {"imports": IMPORTS_DONE}
+        self.reported = False
+
+    def mark(self, phase):
+        self.marks.setdefault(phase, time.perf_counter())
+
+    def report(self):
+        phases = {}
+        previous = self.started
+        for phase, at in sorted(self.marks.items(), key=lambda item: item[1]):
+            phases[phase] = round((at - previous) * 1000, 1)
+            previous = at
+        phases["total"] = round((previous - self.started) * 1000, 1)
+        return phases
+
+    def finish(self, phase):
+        if self.reported:
+            return
+        self.mark(phase)
+        self.reported = True
+        phases = self.report()
+        print("Startup: " + " | ".join(f"{phase} {ms:.0f} ms" for phase, ms in phases.items()))
+        report_path = os.environ.get("TOKENZ_STARTUP_REPORT")
+        if report_path:
+            with open(report_path, 'w') as file:
+                json.dump(phases, file, indent=2)
+
+def word_count(text):
+    return text.word_count() if isinstance(text, MappedText) else len(text.split())
+
+def parse_token_query(tokenizer, query):
+    # "50256" or "464, 3290" are token ids; anything else is tokenized as text, or None without a tokenizer
+    parts = query.replace(",", " ").split()
+    if parts and all(part.isdigit() for part in parts):
+        return [int(part) for part in parts]
+    if tokenizer is None:
+        return None
+    return tokenizer(query, add_special_tokens=False)["input_ids"]
+
+@traced("insert_tokens", "render")
+def insert_tokens(cursor, text, tokens, formats=None):
+    # One edit block with shared formats; the caller suspends updates around it
+    plain = QTextCharFormat()
+    cursor.beginEditBlock()
+    for i, (start, end) in enumerate(tokens.offsets()):
+        cursor.insertText(text[start:end], formats[i % len(formats)] if formats else plain)
+        cursor.insertText(" ", plain)  # Add space between tokens for readability
+    cursor.endEditBlock()
 
 class LineNumberArea(QWidget):
     def __init__(self, editor):
@@ -20,68 +115,264 @@ class LineNumberArea(QWidget):
         self.editor.lineNumberAreaPaintEvent(event)
 
 class CodeEditor(QPlainTextEdit):
+    # Sized for multi-million-line documents: the gutter keeps its metrics and laid-out numbers, changes
+    # width only when the line count gains or loses a digit, and repaints only the strips Qt reports dirty
     def __init__(self, parent=None):
         super().__init__(parent)
         self.lineNumberArea = LineNumberArea(self)
+        # Number shown for the first block; pages of a large file start further down
+        self.firstLineNumber = 1
+        self.gutterDigits = 0
+        self.lineNumbers = {}  # number -> (QStaticText, width)
+        self.updateFontMetrics()
+        # Current-line highlight and Find All results, kept apart so each is rebuilt only when it changes
+        self.currentLine = None
+        self.lineSelections = []
+        self.matchSelections = []
+        # Find All results as sorted (starts, ends); only the visible ones become extra selections
+        self.matches = None
+        self.matchFormat = QTextCharFormat()
+        self.matchFormat.setBackground(QColor("#EBCB8B"))
+        self.matchFormat.setForeground(QColor("#2E3440"))
         self.blockCountChanged.connect(self.updateLineNumberAreaWidth)
         self.updateRequest.connect(self.updateLineNumberArea)
         self.cursorPositionChanged.connect(self.highlightCurrentLine)
+        self.verticalScrollBar().valueChanged.connect(self.updateMatchSelections)
+        self.document().contentsChange.connect(self.clearMatches)
         self.updateLineNumberAreaWidth(0)
 
+    def updateFontMetrics(self):
+        metrics = self.fontMetrics()
+        self.lineHeight = metrics.height()
+        self.digitWidth = metrics.horizontalAdvance('9')
+        self.lineNumbers.clear()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self.updateFontMetrics()
+            self.gutterDigits = 0  # Force the width to be recomputed with the new digit width
+            self.updateLineNumberAreaWidth(0)
+
     def lineNumberAreaWidth(self):
-        digits = 1
-        max_value = max(1, self.blockCount())
-        while max_value >= 10:
-            max_value /= 10
-            digits += 1
-        space = 3 + self.fontMetrics().horizontalAdvance('9') * digits
+        digits = len(str(max(1, self.blockCount() + self.firstLineNumber - 1)))
+        space = 3 + self.digitWidth * digits
         return space
 
     def updateLineNumberAreaWidth(self, _):
-        self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+        digits = len(str(max(1, self.blockCount() + self.firstLineNumber - 1)))
+        if digits != self.gutterDigits:
+            # Resetting the margins relays out the viewport, so only do it when the width really changes
+            self.gutterDigits = digits
+            self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+            cr = self.contentsRect()
+            self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height()))
 
     def updateLineNumberArea(self, rect, dy):
         if dy:
             self.lineNumberArea.scroll(0, dy)
         else:
             self.lineNumberArea.update(0, rect.y(), self.lineNumberArea.width(), rect.height())
-        if rect.contains(self.viewport().rect()):
-            self.updateLineNumberAreaWidth(0)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
         cr = self.contentsRect()
         self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height()))
+        if self.matches is not None:
+            self.updateMatchSelections()
+
+    def lineNumber(self, number):
+        entry = self.lineNumbers.get(number)
+        if entry is None:
+            if len(self.lineNumbers) >= LINE_NUMBER_CACHE_SIZE:
+                self.lineNumbers.clear()
+            text = QStaticText(str(number))
+            text.setTextFormat(Qt.PlainText)
+            entry = self.lineNumbers[number] = (text, self.digitWidth * len(str(number)))
+        return entry
 
     def lineNumberAreaPaintEvent(self, event):
         painter = QPainter(self.lineNumberArea)
-        painter.fillRect(event.rect(), Qt.lightGray)
+        dirty = event.rect()
+        painter.fillRect(dirty, Qt.lightGray)
+        painter.setPen(Qt.black)
+        painter.setFont(self.font())
+        width = self.lineNumberArea.width()
         block = self.firstVisibleBlock()
         blockNumber = block.blockNumber()
         top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
-        bottom = top + self.blockBoundingRect(block).height()
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and bottom >= event.rect().top():
-                number = str(blockNumber + 1)
-                painter.setPen(Qt.black)
-                painter.drawText(0, int(top), self.lineNumberArea.width(), self.fontMetrics().height(),
-                                Qt.AlignRight, number)
+        while block.isValid() and top <= dirty.bottom():
+            height = self.blockBoundingRect(block).height()
+            if block.isVisible() and top + height >= dirty.top():
+                text, textWidth = self.lineNumber(blockNumber + self.firstLineNumber)
+                painter.drawStaticText(width - textWidth, int(top), text)
             block = block.next()
-            top = bottom
-            bottom = top + self.blockBoundingRect(block).height()
+            top += height
             blockNumber += 1
 
+    def setFirstLineNumber(self, number):
+        self.firstLineNumber = number
+        self.updateLineNumberAreaWidth(0)
+        self.lineNumberArea.update()
+
     def highlightCurrentLine(self):
+        # Moving within a line keeps the highlight; its cursor follows edits on its own
+        cursor = self.textCursor()
+        block = cursor.block()
+        line = block.layout().lineForTextPosition(cursor.positionInBlock()) if block.layout() else None
+        currentLine = (block.blockNumber(), line.lineNumber() if line is not None and line.isValid() else 0,
+                       self.isReadOnly())
+        if currentLine == self.currentLine:
+            return
+        self.currentLine = currentLine
         extraSelections = []
         if not self.isReadOnly():
             selection = QTextEdit.ExtraSelection()
             lineColor = QColor(Qt.yellow).lighter(160)
             selection.format.setBackground(lineColor)
             selection.format.setProperty(QTextFormat.FullWidthSelection, True)
-            selection.cursor = self.textCursor()
+            selection.cursor = cursor
             selection.cursor.clearSelection()
             extraSelections.append(selection)
-        self.setExtraSelections(extraSelections)
+        self.lineSelections = extraSelections
+        self.setExtraSelections(self.lineSelections + self.matchSelections)
+
+    def updateMatchSelections(self, *_):
+        if self.matches is None and not self.matchSelections:
+            return
+        self.matchSelections = self.visibleMatchSelections()
+        self.setExtraSelections(self.lineSelections + self.matchSelections)
+
+    def setMatches(self, starts, ends):
+        self.matches = (starts, ends) if starts is not None and len(starts) else None
+        self.updateMatchSelections()
+
+    def clearMatches(self, *_):
+        # Edits move the text under the matches; they are found again on the next Find All
+        if self.matches is not None:
+            self.matches = None
+            self.updateMatchSelections()
+
+    def visibleMatchSelections(self):
+        if self.matches is None:
+            return []
+        starts, ends = self.matches
+        first = self.firstVisibleBlock().position()
+        last = self.cursorForPosition(QPoint(self.viewport().width(), self.viewport().height())).position()
+        lo = int(ends.searchsorted(ends.dtype.type(first), side="right"))
+        hi = min(int(starts.searchsorted(starts.dtype.type(last))), lo + VISIBLE_MATCH_LIMIT)
+        selections = []
+        for start, end in zip(starts[lo:hi].tolist(), ends[lo:hi].tolist()):
+            selection = QTextEdit.ExtraSelection()
+            selection.format = self.matchFormat
+            selection.cursor = QTextCursor(self.document())
+            selection.cursor.setPosition(start)
+            selection.cursor.setPosition(end, QTextCursor.KeepAnchor)
+            selections.append(selection)
+        return selections
+
+class TokenView(QAbstractScrollArea):
+    # Paints only the rows in the viewport; rows are looked up in the token layout on demand
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text = ""
+        self.token_layout = None
+        self.colors = None
+        self.highlights = None  # Sorted indices of the tokens marked by a token search
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        # Results here span many screens anyway; a scroll bar showing up would narrow the rows and lay them out again
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+
+    @traced("layout", "render")
+    def set_tokens(self, text, tokens, colors=None, lines=None):
+        self.text = text
+        self.colors = colors
+        self.highlights = None
+        self.token_layout = TokenLayout(text, tokens, self.columns(), lines)
+        self.updateScrollBar()  # Keeps the scroll position, clamped to the new range
+        self.viewport().update()
+
+    def clear(self):
+        self.text = ""
+        self.token_layout = None
+        self.highlights = None
+        self.updateScrollBar()
+        self.viewport().update()
+
+    def set_highlights(self, indices):
+        self.highlights = indices if indices is not None and len(indices) else None
+        self.viewport().update()
+
+    def scrollToToken(self, index):
+        if self.token_layout:
+            self.verticalScrollBar().setValue(self.token_layout.row_of(index) - self.visibleRows() // 2)
+
+    def columns(self):
+        return max(1, self.viewport().width() // max(1, self.fontMetrics().horizontalAdvance('M')))
+
+    def token_at(self, pos):
+        if not self.token_layout:
+            return -1
+        metrics = self.fontMetrics()
+        row = self.verticalScrollBar().value() + pos.y() // metrics.height()
+        return self.token_layout.token_at(row, pos.x() // metrics.horizontalAdvance('M'))
+
+    def visibleRows(self):
+        return max(1, self.viewport().height() // max(1, self.fontMetrics().height()))
+
+    def updateScrollBar(self):
+        rows = self.token_layout.row_count if self.token_layout else 0
+        visible = self.visibleRows()
+        self.verticalScrollBar().setRange(0, max(0, rows - visible))
+        self.verticalScrollBar().setPageStep(visible)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.token_layout and self.token_layout.columns != self.columns():
+            self.token_layout.set_columns(self.columns())
+        self.updateScrollBar()
+
+    @traced("paint", "render")
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), QColor("#3B4252"))
+        if not self.token_layout:
+            return
+        metrics = self.fontMetrics()
+        char_width = metrics.horizontalAdvance('M')
+        line_height = metrics.height()
+        painter.setPen(QColor("#E5E9F0"))
+        first_row = self.verticalScrollBar().value()
+        first_visible = event.rect().top() // line_height
+        last_visible = event.rect().bottom() // line_height
+        rows = [(visible_row * line_height, list(self.token_layout.row_fragments(first_row + visible_row)))
+                for visible_row in range(first_visible, last_visible + 1)]
+        marked = self.visibleHighlights(rows)
+        for top, fragments in rows:
+            for index, column, start, end in fragments:
+                piece = self.text[start:end].translate(DISPLAY_TABLE)
+                x = column * char_width
+                if index in marked:
+                    painter.fillRect(x, top, len(piece) * char_width, line_height, QColor("#EBCB8B"))
+                    painter.setPen(QColor("#2E3440"))
+                    painter.drawText(x, top + metrics.ascent(), piece)
+                    painter.setPen(QColor("#E5E9F0"))
+                    continue
+                if self.colors:
+                    painter.fillRect(x, top, len(piece) * char_width, line_height,
+                                     self.colors[index % len(self.colors)])
+                painter.drawText(x, top + metrics.ascent(), piece)
+
+    def visibleHighlights(self, rows):
+        # Only the slice of highlights between the first and last visible token is looked at
+        indices = [fragment[0] for _, fragments in rows for fragment in fragments]
+        if self.highlights is None or not indices:
+            return set()
+        key = self.highlights.dtype.type
+        lo = self.highlights.searchsorted(key(indices[0]))
+        hi = self.highlights.searchsorted(key(indices[-1]), side="right")
+        return set(self.highlights[lo:hi].tolist())
 
 class CustomTitleBar(QWidget):
     def __init__(self, parent=None):
@@ -192,36 +483,455 @@ class CustomTitleBar(QWidget):
 
 class TokenizationWorker(QRunnable):
     class Signals(QObject):
-        result = pyqtSignal(object)
-        progress = pyqtSignal(int)
+        result = pyqtSignal(int, object)
+        progress = pyqtSignal(int, int)
+        # Tokens so far and the line starts they cover, sent while more blocks remain
+        partial = pyqtSignal(int, object, object)
+        # Token and word count of a count-only job
+        counted = pyqtSignal(int, object, object)
+
+    def __init__(self, tokenizer, text, window_size=WINDOW_SIZE, generation=0, is_current=None, cache=None,
+                 server=None, count_only=False):
+        super().__init__()
+        self.tokenizer = tokenizer
+        self.text = text
+        self.window_size = window_size
+        self.generation = generation
+        self.is_current = is_current or (lambda generation: True)
+        self.cache = cache
+        self.server = server
+        self.count_only = count_only
+        self.signals = self.Signals()
+        self.queued = time.perf_counter_ns()
+
+    @traced("tokenize", "worker")
+    def run(self):
+        if tracer.enabled:
+            tracer.record("queued", "worker", self.queued, time.perf_counter_ns())
+        if not self.is_current(self.generation):
+            return  # Superseded while still queued
+        key = None
+        if self.cache is not None and self.cache.wants(self.text):
+            key = self.cache.key(self.tokenizer, self.text)
+            hit = self.cache.get(key)
+            if hit is not None:
+                self.signals.progress.emit(self.generation, 100)
+                if self.count_only:
+                    self.signals.counted.emit(self.generation, len(hit[1]), word_count(self.text))
+                else:
+                    self.signals.result.emit(self.generation, hit[1])
+                return
+        if self.count_only:
+            count = self.stream(self.collect_count, self.server_counts,
+                                lambda: count_stream(self.tokenizer, self.text, self.window_size))
+            if count is not None:
+                self.signals.counted.emit(self.generation, count, word_count(self.text))
+            return
+        # Windows are cut at pre-token boundaries and offsets come back absolute,
+        # so the result matches tokenizing the whole text in one call
+        tokens = self.stream(self.collect_tokens, self.server_blocks,
+                             lambda: tokenize_stream(self.tokenizer, self.text, self.window_size))
+        if tokens is None:
+            return  # Superseded by a newer request
+        self.signals.result.emit(self.generation, tokens)
+        if key is not None:
+            self.cache.put(key, tokens, {"model": self.tokenizer.name_or_path, "characters": len(self.text)})
+
+    def stream(self, collect, remote, local):
+        """collect() the server's blocks, or the local ones when there is no server or it fails."""
+        if self.server:
+            try:
+                return collect(remote())
+            except (OSError, RuntimeError) as error:
+                print(f"Tokenization server unavailable, tokenizing locally: {error}")
+        return collect(local())
+
+    def server_blocks(self):
+        # Same blocks as tokenize_stream: the server adds special tokens to every piece, so they
+        # are cut off each one and sent once around the whole text
+        from tokenz.server import TokenizerClient
+        prefix, suffix = special_tokens(self.tokenizer)
+        with TokenizerClient(self.server) as client:
+            if prefix:
+                yield TokenBuffer.from_encoding(prefix, [(0, 0)] * len(prefix)), 0
+            for start, piece in iter_pieces(self.text, SERVER_PIECE_CHARS):
+                tokens = client.tokenize(self.tokenizer.name_or_path, piece)
+                block = TokenBuffer()
+                block.extend(tokens[len(prefix):len(tokens) - len(suffix)], start)
+                yield block, start + len(piece)
+            if suffix:
+                yield TokenBuffer.from_encoding(suffix, [(0, 0)] * len(suffix)), len(self.text)
+
+    def server_counts(self):
+        from tokenz.server import TokenizerClient
+        prefix, suffix = special_tokens(self.tokenizer)
+        specials = len(prefix) + len(suffix)
+        with TokenizerClient(self.server) as client:
+            yield specials, 0
+            for start, piece in iter_pieces(self.text, SERVER_PIECE_CHARS):
+                yield client.count(self.tokenizer.name_or_path, piece) - specials, start + len(piece)
+
+    def collect_tokens(self, blocks):
+        """Join (block, consumed) blocks, sending partial results; None if superseded."""
+        tokens = TokenBuffer()
+        text_length = max(1, len(self.text))
+        lines = None
+        last_report = 0
+        for block, consumed in blocks:
+            if not self.is_current(self.generation):
+                return None  # Stop between blocks
+            tokens.extend(block)
+            now = time.perf_counter()
+            if consumed < len(self.text) and (now - last_report) * 1000 >= PARTIAL_INTERVAL_MS:
+                # The first report goes out after the first block so something shows at once
+                last_report = now
+                if lines is None:
+                    lines = line_starts(self.text)
+                # A prefix view: later blocks only append, so it never changes under the reader
+                partial_lines = lines[:int(lines.searchsorted(consumed, side="right"))]
+                self.signals.partial.emit(self.generation, tokens[:len(tokens)], partial_lines)
+                self.signals.progress.emit(self.generation, consumed * 100 // text_length)
+        return tokens
+
+    def collect_count(self, counts):
+        # No offsets and nothing to draw: only ids are counted, a batch of windows at a time
+        count = 0
+        text_length = max(1, len(self.text))
+        last_report = time.perf_counter()
+        for block_count, consumed in counts:
+            if not self.is_current(self.generation):
+                return None
+            count += block_count
+            now = time.perf_counter()
+            if consumed < len(self.text) and (now - last_report) * 1000 >= PARTIAL_INTERVAL_MS:
+                last_report = now
+                self.signals.progress.emit(self.generation, consumed * 100 // text_length)
+        return count
+
+class TokenizationScheduler(QObject):
+    # Every request gets a new generation number. Older jobs stop at their next block
+    # and anything they still emit is dropped, so only the newest result reaches the UI.
+    result = pyqtSignal(object, object, object)
+    partial = pyqtSignal(object, object, object)
+    counted = pyqtSignal(object, object, object, object)
+    progress = pyqtSignal(int)
+
+    def __init__(self, max_jobs=2, cache=None, server=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.server = server
+        self.generation = 0
+        self.delivered = 0
+        self.text = ""
+        self.tokenizer = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_jobs)
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def pending(self):
+        return self.delivered != self.generation
+
+    def submit(self, tokenizer, text, count_only=False):
+        self.generation += 1
+        self.text = text
+        self.tokenizer = tokenizer
+        worker = TokenizationWorker(tokenizer, text, generation=self.generation, is_current=self.is_current,
+                                    cache=self.cache, server=self.server, count_only=count_only)
+        worker.signals.result.connect(self.handle_result)
+        worker.signals.partial.connect(self.handle_partial)
+        worker.signals.counted.connect(self.handle_counted)
+        worker.signals.progress.connect(self.handle_progress)
+        self.pool.start(worker)
+        return self.generation
+
+    def cancel(self):
+        self.generation += 1
+        self.delivered = self.generation
+        self.text = ""
+        self.tokenizer = None
+
+    def handle_result(self, generation, tokens):
+        if self.is_current(generation):
+            self.delivered = generation
+            self.result.emit(tokens, self.text, self.tokenizer)
+
+    def handle_partial(self, generation, tokens, lines):
+        if self.is_current(generation):
+            self.partial.emit(tokens, self.text, lines)
+
+    def handle_counted(self, generation, count, words):
+        if self.is_current(generation):
+            self.delivered = generation
+            self.counted.emit(count, words, self.text, self.tokenizer)
+
+    def handle_progress(self, generation, value):
+        if self.is_current(generation):
+            self.progress.emit(value)
+
+class TokenizerLoader(QRunnable):
+    class Signals(QObject):
+        loaded = pyqtSignal(str, object)
+        failed = pyqtSignal(str, str)
 
-    def __init__(self, tokenizer, text, max_length=1024):
+    def __init__(self, cache, name):
+        super().__init__()
+        self.cache = cache
+        self.name = name
+        self.signals = self.Signals()
+
+    def run(self):
+        try:
+            tokenizer = self.cache.get(self.name)
+        except Exception as error:
+            self.signals.failed.emit(self.name, str(error))
+            return
+        self.signals.loaded.emit(self.name, tokenizer)
+
+class ComparisonWorker(QRunnable):
+    class Signals(QObject):
+        result = pyqtSignal(str, object, object)
+        failed = pyqtSignal(str, object, str)
+
+    def __init__(self, tokenizers, name, text, cache=None):
+        super().__init__()
+        self.tokenizers = tokenizers
+        self.name = name
+        self.text = text
+        self.cache = cache
+        self.signals = self.Signals()
+
+    @traced("compare", "worker")
+    def run(self):
+        # Fast tokenizers release the GIL while encoding, so models run side by side
+        try:
+            tokenizer = self.tokenizers.get(self.name)
+            tokens = cached_tokenize(self.cache, tokenizer, self.text,
+                                     {"model": self.name, "characters": len(self.text)})
+        except Exception as error:
+            self.signals.failed.emit(self.name, self.text, str(error))
+            return
+        self.signals.result.emit(self.name, self.text, tokens)
+
+class ComparisonDialog(QDialog):
+    def __init__(self, machine):
+        super().__init__(machine)
+        self.machine = machine
+        self.setWindowTitle("Compare Tokenizers")
+        self.resize(900, 600)
+        # Results for self.text, kept while it is unchanged so adding a model only runs that model
+        self.text = None
+        self.results = {}
+        self.pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, QThread.idealThreadCount()))
+
+        layout = QVBoxLayout(self)
+        top_layout = QHBoxLayout()
+        self.model_checks = QListWidget()
+        self.model_checks.setMaximumHeight(120)
+        for name in machine.model_list:
+            item = QListWidgetItem(name)
+            item.setCheckState(Qt.Checked)
+            self.model_checks.addItem(item)
+        self.model_checks.itemChanged.connect(self.refresh)
+        top_layout.addWidget(self.model_checks, 1)
+        compare_button = QPushButton("Compare")
+        compare_button.clicked.connect(self.run_comparison)
+        top_layout.addWidget(compare_button, 0, Qt.AlignTop)
+        layout.addLayout(top_layout)
+
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Model", "Tokens", "Chars/Token", "Shared Boundaries", "Unique Boundaries"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().hide()
+        layout.addWidget(self.table)
+
+        self.diff_view = QTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setStyleSheet("font-family: 'Fira Code', 'Consolas', monospace; font-size: 13px;")
+        layout.addWidget(self.diff_view, 1)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+    def selected_models(self):
+        return [self.model_checks.item(row).text() for row in range(self.model_checks.count())
+                if self.model_checks.item(row).checkState() == Qt.Checked]
+
+    def run_comparison(self):
+        machine = self.machine
+        text = machine.mapped if machine.mapped is not None else machine.text_input.toPlainText()
+        if text is not self.text and (isinstance(text, MappedText) or text != self.text):
+            self.text = text
+            self.results = {}
+            self.pending = set()
+            # The main view already holds the current model's result
+            current = machine.tokenizers.peek(machine.current_model)
+            if machine.tokens is not None and current is not None and current is machine.tokenizer and (
+                    machine.tokens_text is text or machine.tokens_text == text):
+                self.results[machine.current_model] = machine.tokens
+        for name in self.selected_models():
+            if name in self.results or name in self.pending:
+                continue
+            worker = ComparisonWorker(machine.tokenizers, name, text, machine.scheduler.cache)
+            worker.signals.result.connect(self.handle_result)
+            worker.signals.failed.connect(self.handle_failed)
+            self.pending.add(name)
+            self.pool.start(worker)
+        self.refresh()
+
+    def handle_result(self, name, text, tokens):
+        if text is self.text:
+            self.pending.discard(name)
+            self.results[name] = tokens
+            self.refresh()
+
+    def handle_failed(self, name, text, error):
+        if text is self.text:
+            self.pending.discard(name)
+            self.status_label.setText(f"{name}: {error}")
+
+    def release_text(self, text):
+        # text is a mapping about to be closed; jobs still reading it fail and are dropped
+        if self.text is text:
+            self.text = None
+            self.results = {}
+            self.pending = set()
+            self.refresh()
+
+    def refresh(self):
+        selected = self.selected_models()
+        results = {name: self.results[name] for name in selected if name in self.results}
+        waiting = [name for name in selected if name in self.pending]
+        self.status_label.setText(f"Tokenizing with {', '.join(waiting)}..." if waiting else "")
+        if self.text is None:
+            return
+        rows, common = compare_results(results, len(self.text))
+        self.table.setRowCount(len(rows))
+        for row, stats in enumerate(rows):
+            cells = [stats["model"], f"{stats['tokens']:,}", f"{stats['chars_per_token']:.2f}",
+                     f"{stats['agreement']:.1%}", f"{stats['unique_boundaries']:,}"]
+            for column, value in enumerate(cells):
+                item = QTableWidgetItem(value)
+                item.setFlags(Qt.ItemIsEnabled)
+                self.table.setItem(row, column, item)
+
+        # Each model's split of the start of the text; cuts only some models make are red
+        html = []
+        for name, tokens in results.items():
+            html.append(f"<p><b>{escape(name)}</b><br>")
+            for piece, shared in aligned_segments(self.text, tokens, common, COMPARE_PREVIEW_CHARS):
+                color = "#A3BE8C" if shared else "#BF616A"
+                html.append(f"{escape(piece.translate(DISPLAY_TABLE))}<span style='color: {color}'>|</span>")
+            html.append("</p>")
+        self.diff_view.setHtml("".join(html))
+
+class StatsWorker(QRunnable):
+    class Signals(QObject):
+        result = pyqtSignal(int, object)
+
+    def __init__(self, tokenizer, tokens, text, generation, layout=None):
         super().__init__()
         self.tokenizer = tokenizer
+        self.tokens = tokens
         self.text = text
-        self.max_length = max_length
+        self.generation = generation
+        self.layout = layout
         self.signals = self.Signals()
 
+    @traced("stats", "worker")
     def run(self):
-        chunks = [self.text[i:i+self.max_length] for i in range(0, len(self.text), self.max_length)]
-        total_tokens = []
-        total_offsets = []
-        
-        for i, chunk in enumerate(chunks):
-            tokens = self.tokenizer(chunk, add_special_tokens=True, return_offsets_mapping=True)
-            total_tokens.extend(tokens["input_ids"])
-            
-            # Adjust offsets for chunks after the first one
-            if i > 0:
-                offset_adjustment = i * self.max_length
-                adjusted_offsets = [(start + offset_adjustment, end + offset_adjustment) for start, end in tokens["offset_mapping"]]
-                total_offsets.extend(adjusted_offsets)
-            else:
-                total_offsets.extend(tokens["offset_mapping"])
-            
-            self.signals.progress.emit((i + 1) * 100 // len(chunks))
+        if self.tokenizer is None:
+            # Imported from a model that is not available: there is no vocabulary to compare against
+            stats = token_stats(self.tokens, self.text, layout=self.layout)
+            stats["top_tokens"] = [f"#{token_id}" for token_id, _ in stats["top"]]
+        else:
+            stats = token_stats(self.tokens, self.text, len(self.tokenizer), self.tokenizer.unk_token_id,
+                                layout=self.layout)
+            stats["top_tokens"] = [self.tokenizer.decode([token_id]) for token_id, _ in stats["top"]]
+        stats["words"] = word_count(self.text)
+        self.signals.result.emit(self.generation, stats)
 
-        self.signals.result.emit({"input_ids": total_tokens, "offset_mapping": total_offsets})
+class IndexWorker(QRunnable):
+    class Signals(QObject):
+        built = pyqtSignal(object)
+
+    def __init__(self, tokens):
+        super().__init__()
+        self.tokens = tokens
+        self.signals = self.Signals()
+
+    @traced("index", "worker")
+    def run(self):
+        self.signals.built.emit(TokenIndex(self.tokens))
+
+def format_stats(stats):
+    density = stats["line_density"]
+    top = ", ".join(f"'{token.translate(DISPLAY_TABLE)}' ×{count:,}" for token, (_, count) in zip(stats["top_tokens"], stats["top"]))
+    peak = max(stats["lengths"]) or 1
+    histogram = [f"{length:>3}{'+' if length == len(stats['lengths']) - 1 else ' '} {'█' * (count * 30 // peak)} {count:,}"
+                 for length, count in enumerate(stats["lengths"]) if count]
+    # No coverage without the vocabulary of the tokenizer behind the result
+    coverage = f" ({stats['vocab_coverage']:.2%} of vocabulary)" if stats["vocab_coverage"] else ""
+    return "\n".join([
+        f"Chars/Token: {stats['chars_per_token']:.2f}   Distinct IDs: {stats['distinct']:,}{coverage}   "
+        f"Unknown: {stats['unknown']:,} ({stats['unknown_rate']:.2%})",
+        f"Lines: {stats['lines']:,}   Tokens/Line: mean {density['mean']:.1f}, p95 {density['p95']:.0f}, "
+        f"max {density['max']:,} (line {density['densest_line']:,})",
+        f"Top tokens: {top}",
+        "Token lengths:",
+    ] + histogram)
+
+class FileMapper(QRunnable):
+    class Signals(QObject):
+        mapped = pyqtSignal(str, object)
+        failed = pyqtSignal(str, str)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.signals = self.Signals()
+
+    @traced("map_file", "worker")
+    def run(self):
+        # Indexing the line starts reads the whole file once; keep it off the GUI thread
+        try:
+            mapped = MappedText(self.path)
+        except (OSError, ValueError) as error:
+            self.signals.failed.emit(self.path, str(error))
+            return
+        self.signals.mapped.emit(self.path, mapped)
+
+class TokenFileWorker(QRunnable):
+    # Saves a result with its text, or maps one back in; both can take a moment on large documents
+    class Signals(QObject):
+        saved = pyqtSignal(str)
+        loaded = pyqtSignal(str, object)
+        failed = pyqtSignal(str, str)
+
+    def __init__(self, path, tokens=None, text=None, metadata=None):
+        super().__init__()
+        self.path = path
+        self.tokens = tokens
+        self.text = text
+        self.metadata = metadata
+        self.signals = self.Signals()
+
+    @traced("token_file", "worker")
+    def run(self):
+        try:
+            if self.tokens is None:
+                document = read_document(self.path, LARGE_FILE_BYTES)
+            else:
+                write_document(self.path, self.tokens, self.text, self.metadata)
+        except (OSError, ValueError, UnicodeError) as error:
+            self.signals.failed.emit(self.path, str(error))
+            return
+        if self.tokens is None:
+            self.signals.loaded.emit(self.path, document)
+        else:
+            self.signals.saved.emit(self.path)
 
 class CustomToolBar(QWidget):
     def __init__(self, parent=None):
@@ -279,10 +989,13 @@ class CustomToolBar(QWidget):
         self.clear_btn = QPushButton("Clear")
         self.save_btn = QPushButton("Save")
         self.open_btn = QPushButton("Open")
+        self.export_btn = QPushButton("Export Tokens")
+        self.import_btn = QPushButton("Import Tokens")
         self.find_btn = QPushButton("Find")
 
         # Add buttons to layout
-        for btn in [self.tokenize_btn, self.clear_btn, self.save_btn, self.open_btn, self.find_btn]:
+        for btn in [self.tokenize_btn, self.clear_btn, self.save_btn, self.open_btn, self.export_btn, self.import_btn,
+                    self.find_btn]:
             btn.setStyleSheet("""
                 QPushButton {
                     background-color: transparent;
@@ -307,8 +1020,9 @@ class CustomToolBar(QWidget):
         """)
 
 class TokenzMachine(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup_timer=None):
         super().__init__()
+        self.startup_timer = startup_timer
         self.setWindowTitle("Tokenz Machine")
         self.setGeometry(100, 100, 1200, 800)
         # Remove toolbar area and set window flags
@@ -320,7 +1034,8 @@ class TokenzMachine(QMainWindow):
         ]
 
         self.current_model = self.model_list[0]
-        self.tokenizer = AutoTokenizer.from_pretrained(self.current_model)
+        self.tokenizers = TokenizerCache(TOKENIZER_CACHE_SIZE)
+        self.tokenizer = None  # Loaded in the background once the window is up
 
         self.color_gradients = {
             "Nord Aurora": ["#BF616A", "#D08770", "#EBCB8B", "#A3BE8C", "#B48EAD"],
@@ -363,12 +1078,62 @@ class TokenzMachine(QMainWindow):
 
 
 
+        self.palette_cache = {}
+        self.format_cache = {}
+        # Latest result, the exact text it was computed from and the tokenizer that produced it
+        self.tokens = None
+        self.tokens_text = ""
+        self.tokens_tokenizer = None
+        # Metadata an imported result came with, saved again when it is exported unchanged
+        self.tokens_metadata = None
+        # (count, text, tokenizer) of the latest count-only result
+        self.counted = None
+        # What the QTextEdit visualization currently shows, for hover lookups
+        self.rendered_text = ""
+        self.rendered_cells = None
+        # Maps token area positions (UTF-16) to cells (code points); built on the first hover after a render
+        self.rendered_offsets = None
+        # Large-file mode: the file stays memory-mapped and the editor shows one page of it
+        self.mapped = None
+        self.page_first = 0
+        self.compare_dialog = None
+        self.stats_generation = 0
+        # Model of an imported result still waiting for its tokenizer to load
+        self.imported_model = None
+        # Tokens in the last partial result drawn for the running job
+        self.partial_count = 0
+        # Replacements of the Replace All being applied, for re-tokenizing only the spans they touch
+        self.bulk_edits = None
+        # Inverted index of the current result for token search, built on the first search
+        self.token_index = None
+        self.pending_token_query = None
+
         self.init_ui()
         self.setup_shortcuts()
         self.setup_token_hover()
-
-        self.threadpool = QThreadPool()
+        self.setup_trace_overlay()
+
+        # Results for big documents persist across sessions, keyed by content and tokenizer.
+        # With TOKENZ_SERVER set, jobs go to a running `python -m tokenz serve` instead.
+        self.scheduler = TokenizationScheduler(cache=ResultCache(), server=os.environ.get("TOKENZ_SERVER"),
+                                               parent=self)
+        self.scheduler.result.connect(self.handle_tokenization_result)
+        self.scheduler.partial.connect(self.handle_partial_result)
+        self.scheduler.counted.connect(self.handle_count_result)
+        self.scheduler.progress.connect(self.update_progress)
+        # Tokenizers load one at a time so pre-warming never competes with tokenization
+        self.loader_pool = QThreadPool(self)
+        self.loader_pool.setMaxThreadCount(1)
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_REFRESH_MS)
+        self.live_timer.timeout.connect(self.refresh_live_result)
+        self.live_full_pass = False
         self.setup_ui_style()
+        # Start loading after the first event loop pass so the window paints first
+        QTimer.singleShot(0, self.start_background_loading)
+        if self.startup_timer:
+            self.startup_timer.mark("ui_build")
         
     def setup_ui_style(self):
         self.setStyleSheet("""
@@ -461,6 +1226,8 @@ class TokenzMachine(QMainWindow):
         self.toolbar.clear_btn.clicked.connect(self.clear_text)
         self.toolbar.save_btn.clicked.connect(self.save_file)
         self.toolbar.open_btn.clicked.connect(self.open_file)
+        self.toolbar.export_btn.clicked.connect(self.export_tokens)
+        self.toolbar.import_btn.clicked.connect(self.import_tokens)
         self.toolbar.find_btn.clicked.connect(self.show_find_dialog)
         main_layout.addWidget(self.toolbar)
 
@@ -505,6 +1272,22 @@ class TokenzMachine(QMainWindow):
         self.color_checkbox.setStyleSheet("font-weight: bold;")
         self.color_checkbox.setChecked(True)  # Enable coloring by default
         controls_layout.addWidget(self.color_checkbox)
+
+        # Live update - re-tokenize edits as you type
+        self.live_checkbox = QCheckBox("Live Update")
+        self.live_checkbox.setStyleSheet("font-weight: bold;")
+        controls_layout.addWidget(self.live_checkbox)
+
+        # Count only - skip offsets, visualization and statistics; counts follow typing
+        self.count_checkbox = QCheckBox("Count Only")
+        self.count_checkbox.setStyleSheet("font-weight: bold;")
+        self.count_checkbox.toggled.connect(self.set_count_only)
+        controls_layout.addWidget(self.count_checkbox)
+
+        # Compare the selected text across all models
+        compare_button = QPushButton("Compare Models")
+        compare_button.clicked.connect(self.show_compare_dialog)
+        controls_layout.addWidget(compare_button)
         controls_layout.addStretch()
         content_layout.addWidget(controls_widget)
 
@@ -530,8 +1313,24 @@ class TokenzMachine(QMainWindow):
             line-height: 1.5;
             min-height: 500px;  /* Ensure minimum height */
         """)
+        self.text_input.document().contentsChange.connect(self.handle_text_change)
         left_layout.addWidget(self.text_input)
         left_layout.setStretch(1, 1)  # Give more stretch to the input area
+
+        # Page controls, only shown for memory-mapped files
+        self.page_bar = QWidget()
+        page_layout = QHBoxLayout(self.page_bar)
+        page_layout.setContentsMargins(0, 0, 0, 0)
+        self.prev_page_btn = QPushButton("◀")
+        self.prev_page_btn.clicked.connect(lambda: self.show_page(self.page_first - PAGE_LINES))
+        self.next_page_btn = QPushButton("▶")
+        self.next_page_btn.clicked.connect(lambda: self.show_page(self.page_first + PAGE_LINES))
+        self.page_label = QLabel()
+        page_layout.addWidget(self.prev_page_btn)
+        page_layout.addWidget(self.page_label, 1, Qt.AlignCenter)
+        page_layout.addWidget(self.next_page_btn)
+        self.page_bar.hide()
+        left_layout.addWidget(self.page_bar)
         split_widget.addWidget(left_widget)
 
         # Right side (visualization)
@@ -545,13 +1344,37 @@ class TokenzMachine(QMainWindow):
         
         self.token_area = QTextEdit()
         self.token_area.setReadOnly(True)
+        self.token_area.setUndoRedoEnabled(False)
         self.token_area.setStyleSheet("""
             font-family: 'Fira Code', 'Consolas', monospace;
             font-size: 14px;
             line-height: 1.5;
             min-height: 500px;  /* Ensure minimum height */
         """)
-        right_layout.addWidget(self.token_area)
+        self.token_view = TokenView()
+        self.token_view.setStyleSheet("""
+            font-family: 'Fira Code', 'Consolas', monospace;
+            font-size: 14px;
+            border: 1px solid #4C566A;
+            border-radius: 5px;
+        """)
+        self.token_stack = QStackedWidget()
+        self.token_stack.addWidget(self.token_area)
+        self.token_stack.addWidget(self.token_view)
+
+        # Statistics panel under the visualization, filled in off the GUI thread
+        self.stats_view = QPlainTextEdit()
+        self.stats_view.setReadOnly(True)
+        self.stats_view.setStyleSheet("""
+            font-family: 'Fira Code', 'Consolas', monospace;
+            font-size: 12px;
+        """)
+        vis_splitter = QSplitter(Qt.Vertical)
+        vis_splitter.setHandleWidth(1)
+        vis_splitter.addWidget(self.token_stack)
+        vis_splitter.addWidget(self.stats_view)
+        vis_splitter.setSizes([500, 160])
+        right_layout.addWidget(vis_splitter)
         right_layout.setStretch(1, 1)  # Give more stretch to the visualization area
         split_widget.addWidget(right_widget)
 
@@ -630,88 +1453,457 @@ class TokenzMachine(QMainWindow):
         clear_shortcut = QShortcut(QKeySequence("Ctrl+L"), self)
         clear_shortcut.activated.connect(self.clear_text)
 
+        # Export / import tokens
+        export_shortcut = QShortcut(QKeySequence("Ctrl+E"), self)
+        export_shortcut.activated.connect(self.export_tokens)
+        import_shortcut = QShortcut(QKeySequence("Ctrl+I"), self)
+        import_shortcut.activated.connect(self.import_tokens)
+
+        # Compare models
+        compare_shortcut = QShortcut(QKeySequence("Ctrl+M"), self)
+        compare_shortcut.activated.connect(self.show_compare_dialog)
+
+        # Pipeline timings
+        trace_shortcut = QShortcut(QKeySequence("Ctrl+Shift+P"), self)
+        trace_shortcut.activated.connect(self.toggle_trace_overlay)
+
     def update_tokenizer(self):
         self.current_model = self.model_combo.currentText()
-        self.tokenizer = AutoTokenizer.from_pretrained(self.current_model)
-        print(f"Switched to {self.current_model} tokenizer")
+        tokenizer = self.tokenizers.peek(self.current_model)
+        if tokenizer is not None:
+            self.set_tokenizer(self.current_model, tokenizer)
+        else:
+            self.statusBar().showMessage(f"Loading {self.current_model} tokenizer...")
+            self.load_tokenizer(self.current_model, priority=1)
+
+    def start_background_loading(self):
+        self.load_tokenizer(self.current_model, priority=1)
+        # Opt-in: on a cold cache every other model would be a download
+        if os.environ.get("TOKENZ_PREWARM"):
+            self.prewarm_tokenizers()
+
+    def load_tokenizer(self, name, priority=0):
+        loader = TokenizerLoader(self.tokenizers, name)
+        loader.signals.loaded.connect(self.handle_tokenizer_loaded)
+        loader.signals.failed.connect(self.handle_tokenizer_failed)
+        self.loader_pool.start(loader, priority)
+
+    def prewarm_tokenizers(self):
+        for name in self.model_list[:TOKENIZER_CACHE_SIZE]:
+            if name not in self.tokenizers:
+                self.load_tokenizer(name)
+
+    def closeEvent(self, event):
+        # Loads and jobs still queued would hold up exit until all of them had run
+        self.loader_pool.clear()
+        self.scheduler.cancel()
+        self.scheduler.pool.clear()
+        super().closeEvent(event)
+
+    def handle_tokenizer_loaded(self, name, tokenizer):
+        # Pre-warm loads finish in the background; only switch if the user is waiting on this one
+        if name == self.current_model and tokenizer is not self.tokenizer:
+            if self.startup_timer:
+                self.startup_timer.finish("tokenizer_ready")
+            self.set_tokenizer(name, tokenizer)
+
+    def handle_tokenizer_failed(self, name, error):
+        print(f"Failed to load {name} tokenizer: {error}")
+        if name == self.current_model:
+            self.statusBar().showMessage(f"Failed to load {name} tokenizer", 5000)
+
+    def set_tokenizer(self, name, tokenizer):
+        self.tokenizer = tokenizer
+        print(f"Switched to {name} tokenizer")
+        self.statusBar().clearMessage()
+        if name == self.imported_model and self.tokens is not None:
+            # The imported result is already shown; it only waited for the tokenizer to compute statistics
+            self.imported_model = None
+            self.tokens_tokenizer = tokenizer
+            self.start_stats()
+            return
         self.calculate_and_visualize_tokens()
 
     def get_random_color(self):
         return QColor(random.randint(128, 255), random.randint(128, 255), random.randint(128, 255))
 
-    def get_color_for_token(self, index, token_count):
+    def token_palette(self):
         selected_gradient = self.gradient_combo.currentText()
-        gradient = self.color_gradients.get(selected_gradient, [])
-
-        if selected_gradient == "Randomize":
-            random.seed(index)
-            return self.get_random_color()
-
-        if gradient:
-            num_colors = len(gradient)
-            if num_colors == 0:
-                return QColor(255, 255, 255)
+        if selected_gradient not in self.palette_cache:
+            if selected_gradient == "Randomize":
+                colors = []
+                for slot in range(RANDOM_PALETTE_SIZE):
+                    random.seed(slot)
+                    colors.append(self.get_random_color())
+            else:
+                colors = [QColor(color) for color in self.color_gradients.get(selected_gradient, [])]
+            self.palette_cache[selected_gradient] = colors or [QColor(255, 255, 255)]
+        return self.palette_cache[selected_gradient]
 
-            color = QColor(gradient[index % num_colors])
-            return color
+    def token_formats(self):
+        selected_gradient = self.gradient_combo.currentText()
+        if selected_gradient not in self.format_cache:
+            formats = []
+            for color in self.token_palette():
+                format = QTextCharFormat()
+                format.setBackground(color)
+                formats.append(format)
+            self.format_cache[selected_gradient] = formats
+        return self.format_cache[selected_gradient]
 
-        return QColor(255, 255, 255)
+    def get_color_for_token(self, index, token_count):
+        palette = self.token_palette()
+        return palette[index % len(palette)]
 
     def calculate_and_visualize_tokens(self):
-        input_text = self.text_input.toPlainText()
+        if self.tokenizer is None:
+            # Runs again from set_tokenizer once the tokenizer has loaded
+            self.statusBar().showMessage(f"Loading {self.current_model} tokenizer...")
+            return
+        # A mapped file is tokenized straight from the mapping, never from the editor page
+        input_text = self.mapped if self.mapped is not None else self.text_input.toPlainText()
         
-        worker = TokenizationWorker(self.tokenizer, input_text)
-        worker.signals.result.connect(self.handle_tokenization_result)
-        worker.signals.progress.connect(self.update_progress)
-        self.threadpool.start(worker)
+        self.partial_count = 0
+        self.live_full_pass = False  # This job covers every edit so far
+        self.scheduler.submit(self.tokenizer, input_text, count_only=self.count_checkbox.isChecked())
         
     def update_progress(self, value):
         self.statusBar().showMessage(f"Tokenization progress: {value}%")
 
-    def handle_tokenization_result(self, tokens):
-        self.token_ids = tokens["input_ids"]
-        self.offsets = tokens["offset_mapping"]
-        token_count = len(self.token_ids)
-        
-        input_text = self.text_input.toPlainText()
-        char_count = len(input_text)
-        word_count = len(input_text.split())
+    def clear_progress(self):
+        # Jobs only report progress while blocks remain; the result ends it
+        if self.statusBar().currentMessage().startswith("Tokenization progress"):
+            self.statusBar().clearMessage()
+
+    @traced("partial", "result")
+    def handle_partial_result(self, tokens, input_text, lines):
+        # Each layout costs O(tokens), so only redraw once the count has doubled;
+        # the total stays within twice the final layout
+        if self.partial_count and len(tokens) < 2 * self.partial_count:
+            return
+        self.partial_count = max(1, len(tokens))
+        palette = self.token_palette() if self.color_checkbox.isChecked() else None
+        self.token_area.clear()
+        # Shown first, so the layout is made for the view's real width and not laid out again
+        self.token_stack.setCurrentWidget(self.token_view)
+        self.token_view.set_tokens(input_text, tokens, palette, lines)
+        self.rendered_cells = None
+        self.result_label.setText(f"Token Count: {len(tokens)}... | Character Count: {len(input_text)} | Word Count: ...")
+
+    def handle_count_result(self, count, words, input_text, tokenizer):
+        self.clear_progress()
+        # Kept for live counting, which only re-counts edited spans; a mapped file is never edited
+        self.counted = (count, input_text, tokenizer) if isinstance(input_text, str) else None
+        self.result_label.setText(f"Token Count: {count} | Character Count: {len(input_text)} | Word Count: {words}")
+
+    def set_count_only(self, enabled):
+        # Drop the visualization either way; leaving count-only mode runs a full job
+        self.tokens = None
+        self.tokens_text = ""
+        self.counted = None
+        self.rendered_cells = None
+        self.token_area.clear()
+        self.token_view.clear()
+        self.stats_generation += 1
+        self.stats_view.setPlainText("Count only: visualization and statistics are off." if enabled else "")
+        self.calculate_and_visualize_tokens()
 
-        self.result_label.setText(f"Token Count: {token_count} | Character Count: {char_count} | Word Count: {word_count}")
+    @traced("result", "result")
+    def handle_tokenization_result(self, tokens, input_text, tokenizer):
+        self.tokens = tokens
+        self.tokens_text = input_text
+        self.tokens_tokenizer = tokenizer
+        self.tokens_metadata = None
+        self.clear_progress()
+        self.show_token_result()
+
+    def show_token_result(self):
+        token_count = len(self.tokens)
+        input_text = self.tokens_text
+        char_count = len(input_text)
 
-        self.visualize_tokens(input_text, self.offsets)
+        # The word count arrives with the statistics
+        self.result_label.setText(f"Token Count: {token_count} | Character Count: {char_count} | Word Count: ...")
+
+        self.visualize_tokens(input_text, self.tokens)
+        self.start_stats()
+
+    def start_stats(self):
+        self.stats_generation += 1
+        if self.tokens_tokenizer is None and self.imported_model is not None:
+            return  # Runs again from set_tokenizer
+        # A large result is already laid out, with the line of every token found
+        layout = self.token_view.token_layout
+        if layout is not None and layout.tokens is not self.tokens:
+            layout = None
+        worker = StatsWorker(self.tokens_tokenizer, self.tokens, self.tokens_text, self.stats_generation, layout)
+        worker.signals.result.connect(self.handle_stats)
+        QThreadPool.globalInstance().start(worker)
+
+    def handle_stats(self, generation, stats):
+        if generation != self.stats_generation:
+            return  # A newer result is already on screen
+        self.result_label.setText(f"Token Count: {stats['tokens']} | Character Count: {stats['characters']} | "
+                                  f"Word Count: {stats['words']}")
+        self.stats_view.setPlainText(format_stats(stats))
+
+    def handle_text_change(self, position, removed, added):
+        # Replace All passes its edits in str offsets; Qt reports the change in UTF-16 units
+        bulk_edits, self.bulk_edits = self.bulk_edits, None
+        if self.tokenizer is None or self.mapped is not None:
+            return
+        count_only = self.count_checkbox.isChecked()
+        # Counts follow every edit, live updates or not
+        if not count_only and not self.live_checkbox.isChecked():
+            # The result no longer matches the text, so once Live Update is back on it starts over
+            self.live_full_pass = True
+            return
+        self.live_timer.start()
+        if count_only:
+            current, base_text, base_tokenizer = self.counted or (None, "", None)
+        else:
+            current, base_text, base_tokenizer = self.tokens, self.tokens_text, self.tokens_tokenizer
+        changed = sum(edit_removed + edit_added for _, edit_removed, edit_added in bulk_edits or [(0, removed, added)])
+        if (self.live_full_pass or current is None or base_tokenizer is not self.tokenizer
+                or self.scheduler.pending() or changed > INCREMENTAL_EDIT_LIMIT):
+            self.live_full_pass = True
+            return
+
+        text = self.text_input.toPlainText()
+        position, removed, added = edit_from_utf16(base_text, text, position, removed, added)
+        if position + added > len(text) or len(text) - added + removed != len(base_text):
+            # The reported change does not line up with the tokenized text
+            self.live_full_pass = True
+            return
+        edits = bulk_edits or [(position, removed, added)]
+        if count_only:
+            count = recount_edits(self.tokenizer, current, base_text, text, edits)
+            self.counted = (count, text, self.tokenizer)
+            self.result_label.setText(f"Token Count: {count} | Character Count: {len(text)} | Word Count: ...")
+            return
+        self.tokens = retokenize_edits(self.tokenizer, self.tokens, text, edits)
+        self.tokens_text = text
+        self.tokens_metadata = None
+        self.result_label.setText(f"Token Count: {len(self.tokens)} | Character Count: {len(text)} | Word Count: ...")
+
+    def refresh_live_result(self):
+        if self.live_full_pass:
+            self.live_full_pass = False
+            self.calculate_and_visualize_tokens()
+        elif self.count_checkbox.isChecked():
+            if self.counted is not None:
+                count, text, tokenizer = self.counted
+                self.handle_count_result(count, word_count(text), text, tokenizer)
+        elif self.tokens is not None:
+            self.show_token_result()
         
-    def visualize_tokens(self, input_text, offsets):
+    @traced("visualize", "render")
+    def visualize_tokens(self, input_text, tokens):
+        scroll_position = self.token_area.verticalScrollBar().value()
         self.token_area.clear()
-        cursor = self.token_area.textCursor()
-        for i, (start, end) in enumerate(offsets):
-            token_text = input_text[start:end]
-            color = self.get_color_for_token(i, len(self.token_ids))
-            format = QTextCharFormat()
-            format.setBackground(color)
-            if self.color_checkbox.isChecked():
-                cursor.insertText(token_text, format)
-            else:
-                cursor.insertText(token_text)
-            cursor.insertText(" ")  # Add space between tokens for readability
+        if len(tokens) > VIRTUAL_VIEW_TOKENS:
+            palette = self.token_palette() if self.color_checkbox.isChecked() else None
+            self.token_stack.setCurrentWidget(self.token_view)
+            self.token_view.set_tokens(input_text, tokens, palette)
+            self.rendered_cells = None
+            return
+
+        self.token_view.clear()
+        self.token_area.setExtraSelections([])
+        self.rendered_text = input_text
+        self.rendered_cells = TokenCells(tokens)
+        self.rendered_offsets = None
+        self.token_stack.setCurrentWidget(self.token_area)
+        formats = self.token_formats() if self.color_checkbox.isChecked() else None
+        self.token_area.setUpdatesEnabled(False)
+        try:
+            insert_tokens(self.token_area.textCursor(), input_text, tokens, formats)
+        finally:
+            self.token_area.setUpdatesEnabled(True)
+        self.token_area.verticalScrollBar().setValue(scroll_position)
 
     def clear_text(self):
+        self.scheduler.cancel()
+        self.tokens = None
+        self.tokens_text = ""
+        self.counted = None
+        self.rendered_cells = None
+        self.close_mapped_file()
         self.text_input.clear()
         self.token_area.clear()
+        self.token_view.clear()
+        self.stats_generation += 1
+        self.stats_view.clear()
         self.result_label.setText("Token Count: 0 | Character Count: 0 | Word Count: 0")
 
     def save_file(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Text Files (*.txt);;All Files (*)")
         if file_path:
             with open(file_path, 'w') as file:
-                file.write(self.text_input.toPlainText())
+                if self.mapped is not None:
+                    for _, piece in self.mapped.iter_pieces():
+                        file.write(piece)
+                else:
+                    file.write(self.text_input.toPlainText())
 
     def open_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Text Files (*.txt);;All Files (*)")
         if file_path:
+            if os.path.getsize(file_path) >= LARGE_FILE_BYTES:
+                self.open_large_file(file_path)
+                return
+            self.close_mapped_file()
             with open(file_path, 'r') as file:
                 self.text_input.setPlainText(file.read())
 
+    def open_large_file(self, file_path):
+        self.statusBar().showMessage(f"Indexing {os.path.basename(file_path)}...")
+        mapper = FileMapper(file_path)
+        mapper.signals.mapped.connect(self.handle_file_mapped)
+        mapper.signals.failed.connect(self.handle_file_failed)
+        QThreadPool.globalInstance().start(mapper)
+
+    def handle_file_mapped(self, file_path, mapped):
+        self.scheduler.cancel()
+        self.close_mapped_file()
+        self.mapped = mapped
+        self.tokens = None
+        self.text_input.setReadOnly(True)
+        self.page_bar.show()
+        self.show_page(0)
+        self.statusBar().showMessage(f"{os.path.basename(file_path)}: {mapped.line_count} lines, read-only", 5000)
+        self.calculate_and_visualize_tokens()
+
+    def handle_file_failed(self, file_path, error):
+        self.statusBar().showMessage(f"Could not open {os.path.basename(file_path)}: {error}", 5000)
+
+    def close_mapped_file(self):
+        if self.mapped is None:
+            return
+        mapped, self.mapped = self.mapped, None
+        # Close the mapping now rather than with its last reference, so the file can be replaced or deleted.
+        # Nothing may read it afterwards: stop the jobs over it and drop every view of it first
+        self.scheduler.cancel()
+        self.scheduler.pool.waitForDone()
+        QThreadPool.globalInstance().waitForDone()
+        if self.compare_dialog is not None:
+            self.compare_dialog.release_text(mapped)
+        if self.tokens_text is mapped:
+            self.tokens = None
+            self.tokens_text = ""
+            self.stats_generation += 1
+        if self.rendered_text is mapped:
+            self.rendered_text = ""
+            self.rendered_cells = None
+            self.token_area.clear()
+        if self.token_view.text is mapped:
+            self.token_view.clear()
+        mapped.close()
+        self.page_first = 0
+        self.text_input.setReadOnly(False)
+        self.text_input.setFirstLineNumber(1)
+        self.page_bar.hide()
+
+    def show_page(self, first_line):
+        mapped = self.mapped
+        if mapped is None:
+            return
+        self.page_first = max(0, min(first_line, mapped.line_count - 1))
+        last_line = min(self.page_first + PAGE_LINES, mapped.line_count)
+        start = int(mapped.line_starts[self.page_first])
+        end = int(mapped.line_starts[last_line]) - 1 if last_line < mapped.line_count else len(mapped)
+        self.text_input.setPlainText(mapped[start:min(end, start + PAGE_CHARS)])
+        self.text_input.setFirstLineNumber(self.page_first + 1)
+        self.page_label.setText(f"Lines {self.page_first + 1}-{last_line} of {mapped.line_count}")
+        self.prev_page_btn.setEnabled(self.page_first > 0)
+        self.next_page_btn.setEnabled(last_line < mapped.line_count)
+
+    def export_tokens(self):
+        if self.tokens is None:
+            self.statusBar().showMessage("Nothing to export yet; tokenize the text first", 5000)
+            return
+        # Describe the tokenizer that produced the result, which need not be the one selected now
+        if self.tokens_metadata is not None:
+            metadata = dict(self.tokens_metadata)
+        elif self.tokens_tokenizer is not None:
+            tokenizer = self.tokens_tokenizer
+            metadata = {"model": tokenizer.name_or_path, "tokenizer": tokenizer.name_or_path,
+                        "fingerprint": tokenizer_fingerprint(tokenizer)}
+        else:
+            self.statusBar().showMessage("The tokenizer of this result is unknown; tokenize the text again to export it", 5000)
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Tokens", "", "Token Files (*.tokz);;All Files (*)")
+        if not file_path:
+            return
+        metadata["characters"] = len(self.tokens_text)
+        if isinstance(self.tokens_text, MappedText):
+            metadata["source"] = self.tokens_text.path
+        worker = TokenFileWorker(file_path, self.tokens, self.tokens_text, metadata)
+        worker.signals.saved.connect(lambda path: self.statusBar().showMessage(f"Exported {os.path.basename(path)}", 5000))
+        worker.signals.failed.connect(self.handle_token_file_failed)
+        self.statusBar().showMessage(f"Exporting {len(self.tokens)} tokens...")
+        QThreadPool.globalInstance().start(worker)
+
+    def import_tokens(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Tokens", "", "Token Files (*.tokz);;All Files (*)")
+        if not file_path:
+            return
+        worker = TokenFileWorker(file_path)
+        worker.signals.loaded.connect(self.handle_tokens_imported)
+        worker.signals.failed.connect(self.handle_token_file_failed)
+        QThreadPool.globalInstance().start(worker)
+
+    def handle_token_file_failed(self, file_path, error):
+        self.statusBar().showMessage(f"{os.path.basename(file_path)}: {error}", 5000)
+
+    def handle_tokens_imported(self, file_path, document):
+        metadata, tokens, text = document
+        if text is None:
+            self.statusBar().showMessage(f"{os.path.basename(file_path)} was saved without its text", 5000)
+            return
+        self.scheduler.cancel()
+        model = metadata.get("model")
+        if model in self.model_list and model != self.current_model:
+            # Select the result's model without starting a job for it
+            self.model_combo.blockSignals(True)
+            self.model_combo.setCurrentText(model)
+            self.model_combo.blockSignals(False)
+            self.current_model = model
+            self.tokenizer = self.tokenizers.peek(model)
+            if self.tokenizer is None:
+                self.imported_model = model
+                self.load_tokenizer(model, priority=1)
+        self.count_checkbox.blockSignals(True)
+        self.count_checkbox.setChecked(False)
+        self.count_checkbox.blockSignals(False)
+
+        self.close_mapped_file()
+        if isinstance(text, MappedText):
+            # Large texts stay mapped inside the token file, like a large file opened directly
+            self.mapped = text
+            self.text_input.setReadOnly(True)
+            self.page_bar.show()
+            self.show_page(0)
+        else:
+            self.text_input.setPlainText(text)
+        self.live_timer.stop()
+        self.live_full_pass = False
+        # Statistics need the tokenizer that produced the tokens; an unknown model has none
+        self.handle_tokenization_result(tokens, text, self.tokenizer if model in self.model_list else None)
+        self.tokens_metadata = metadata
+        message = f"Imported {len(tokens)} tokens from {os.path.basename(file_path)}"
+        if model and model not in self.model_list:
+            message += f" (tokenized with {model})"
+        self.statusBar().showMessage(message, 5000)
+
+    def show_compare_dialog(self):
+        # Kept between openings so earlier results are reused while the text is unchanged
+        if self.compare_dialog is None:
+            self.compare_dialog = ComparisonDialog(self)
+        self.compare_dialog.show()
+        self.compare_dialog.raise_()
+        self.compare_dialog.run_comparison()
+
     def show_find_dialog(self):
         find_dialog = QDialog(self)
         find_dialog.setWindowTitle("Find and Replace")
@@ -735,10 +1927,25 @@ class TokenzMachine(QMainWindow):
         replace_button.clicked.connect(self.replace_text)
         layout.addWidget(replace_button)
 
+        # Options for Find All and Replace All
+        self.regex_checkbox = QCheckBox("Regular expression")
+        layout.addWidget(self.regex_checkbox)
+        self.case_checkbox = QCheckBox("Match case")
+        layout.addWidget(self.case_checkbox)
+
+        find_all_button = QPushButton("Find All")
+        find_all_button.clicked.connect(self.find_all_text)
+        layout.addWidget(find_all_button)
+
         replace_all_button = QPushButton("Replace All")
         replace_all_button.clicked.connect(self.replace_all_text)
         layout.addWidget(replace_all_button)
 
+        # Token ids ("50256", "464 3290") or text to tokenize; every match is highlighted
+        find_tokens_button = QPushButton("Find Tokens")
+        find_tokens_button.clicked.connect(self.find_tokens)
+        layout.addWidget(find_tokens_button)
+
         find_dialog.setLayout(layout)
         find_dialog.exec_()
 
@@ -754,49 +1961,238 @@ class TokenzMachine(QMainWindow):
     def replace_text(self):
         find_text = self.find_input.text()
         replace_text = self.replace_input.text()
-        if find_text and replace_text:
+        if find_text and replace_text and self.mapped is None:
             cursor = self.text_input.textCursor()
             if cursor.hasSelection() and cursor.selectedText() == find_text:
                 cursor.insertText(replace_text)
             self.find_text()
 
+    def find_all_text(self):
+        find_text = self.find_input.text()
+        if not find_text:
+            self.text_input.setMatches(None, None)
+            return
+        started = time.perf_counter()
+        text = self.text_input.toPlainText()
+        try:
+            starts, ends = find_all(text, find_text, self.regex_checkbox.isChecked(), self.case_checkbox.isChecked())
+        except re.error as error:
+            self.statusBar().showMessage(f"Invalid regular expression: {error}", 4000)
+            return
+        if not len(starts):
+            self.text_input.setMatches(None, None)
+            self.statusBar().showMessage("Text not found", 2000)
+            return
+        # Matches are str offsets; the editor counts UTF-16 units
+        offsets = Utf16Offsets(text)
+        starts, ends = offsets.to_utf16(starts), offsets.to_utf16(ends)
+        elapsed = (time.perf_counter() - started) * 1000
+        cursor = self.text_input.textCursor()
+        cursor.setPosition(int(starts[0]))
+        cursor.setPosition(int(ends[0]), QTextCursor.KeepAnchor)
+        self.text_input.setTextCursor(cursor)
+        self.text_input.setMatches(starts, ends)
+        self.statusBar().showMessage(f"{len(starts):,} matches ({elapsed:.1f} ms)")
+
     def replace_all_text(self):
         find_text = self.find_input.text()
         replace_text = self.replace_input.text()
-        if find_text and replace_text:
-            cursor = self.text_input.textCursor()
-            cursor.beginEditBlock()
-            while True:
-                cursor = self.text_input.document().find(find_text, cursor)
-                if cursor.isNull():
-                    break
-                cursor.insertText(replace_text)
-            cursor.endEditBlock()
+        if not (find_text and replace_text) or self.mapped is not None:
+            return
+        text = self.text_input.toPlainText()
+        try:
+            new_text, edits = replace_all(text, find_text, replace_text, self.regex_checkbox.isChecked(),
+                                          self.case_checkbox.isChecked())
+        except re.error as error:
+            self.statusBar().showMessage(f"Invalid regular expression: {error}", 4000)
+            return
+        if not edits:
+            self.statusBar().showMessage("Text not found", 2000)
+            return
+        # The span from the first to the last match is swapped in one edit: one undo step, one relayout,
+        # and one change notification that re-tokenizes just the replaced spans
+        first = edits[0][0]
+        end = edits[-1][0] + edits[-1][1]
+        offsets = Utf16Offsets(text)
+        cursor = self.text_input.textCursor()
+        cursor.setPosition(offsets.to_utf16(first))
+        cursor.setPosition(offsets.to_utf16(end), QTextCursor.KeepAnchor)
+        self.bulk_edits = edits
+        cursor.insertText(new_text[first:end + len(new_text) - len(text)])
+        self.bulk_edits = None
+        self.statusBar().showMessage(f"Replaced {len(edits):,} matches")
+
+    def find_tokens(self):
+        query = self.find_input.text().strip()
+        if not query:
+            self.set_token_highlights(None)
+            return
+        if self.tokens is None:
+            self.statusBar().showMessage("Nothing tokenized to search", 2000)
+            return
+        # Text must become ids the way the shown tokens did, which need not be the selected model's way
+        ids = parse_token_query(self.tokens_tokenizer, query)
+        if ids is None:
+            self.statusBar().showMessage("The tokenizer of this result is not loaded; search by token ids, "
+                                         "e.g. 464, 3290", 5000)
+            return
+        if not ids:
+            self.statusBar().showMessage("The query has no tokens", 2000)
+            return
+        if self.token_index is not None and self.token_index.tokens is self.tokens:
+            self.show_token_matches(self.token_index, ids)
+            return
+        # Built once per result; the search runs as soon as it is ready
+        self.pending_token_query = ids
+        self.statusBar().showMessage(f"Indexing {len(self.tokens):,} tokens...")
+        worker = IndexWorker(self.tokens)
+        worker.signals.built.connect(self.handle_token_index)
+        QThreadPool.globalInstance().start(worker)
+
+    def handle_token_index(self, index):
+        self.token_index = index
+        if index.tokens is self.tokens and self.pending_token_query is not None:
+            self.show_token_matches(index, self.pending_token_query)
+        self.pending_token_query = None
+
+    @traced("token_search", "search")
+    def show_token_matches(self, index, ids):
+        started = time.perf_counter()
+        starts, covered = index.spans(ids)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.set_token_highlights(covered)
+        query = " ".join(str(token_id) for token_id in ids)
+        if not len(starts):
+            self.statusBar().showMessage(f"Tokens [{query}] not found ({elapsed:.2f} ms)", 4000)
+            return
+        self.statusBar().showMessage(f"{len(starts):,} matches of tokens [{query}] ({elapsed:.2f} ms)")
+        if self.token_stack.currentWidget() is self.token_view:
+            self.token_view.scrollToToken(int(starts[0]))
+        elif self.rendered_cells is not None:
+            cursor = QTextCursor(self.token_area.document())
+            cursor.setPosition(self.rendered_utf16().to_utf16(int(self.rendered_cells.cells[starts[0]])))
+            self.token_area.setTextCursor(cursor)
+            self.token_area.ensureCursorVisible()
+
+    def set_token_highlights(self, indices):
+        if self.token_stack.currentWidget() is self.token_view:
+            self.token_view.set_highlights(indices)
+            return
+        selections = []
+        if indices is not None and self.rendered_cells is not None:
+            highlight = QTextCharFormat()
+            highlight.setBackground(QColor("#EBCB8B"))
+            highlight.setForeground(QColor("#2E3440"))
+            document = self.token_area.document()
+            cells = self.rendered_cells.cells
+            offsets = self.rendered_utf16()
+            starts = offsets.to_utf16(cells[indices])
+            ends = offsets.to_utf16(cells[indices + 1] - 1)
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                selection = QTextEdit.ExtraSelection()
+                selection.format = highlight
+                selection.cursor = QTextCursor(document)
+                selection.cursor.setPosition(start)
+                selection.cursor.setPosition(end, QTextCursor.KeepAnchor)
+                selections.append(selection)
+        self.token_area.setExtraSelections(selections)
+
+    def rendered_utf16(self):
+        # Cells count code points; the rendered text's astral characters are found on first use
+        if self.rendered_offsets is None:
+            self.rendered_offsets = Utf16Offsets(self.token_area.toPlainText())
+        return self.rendered_offsets
 
     def setup_token_hover(self):
-        self.token_area.setMouseTracking(True)
-        self.token_area.mouseMoveEvent = self.token_hover_event
-
-    def token_hover_event(self, event):
-        cursor = self.token_area.cursorForPosition(event.pos())
-        cursor.select(QTextCursor.WordUnderCursor)
-        word = cursor.selectedText()
+        self.hover_target = None
+        self.hover_timer = QTimer(self)
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.setInterval(HOVER_INTERVAL_MS)
+        self.hover_timer.timeout.connect(self.show_token_hover)
+        for widget in (self.token_area, self.token_view):
+            widget.setMouseTracking(True)
+            widget.viewport().setMouseTracking(True)
+        self.token_area.mouseMoveEvent = lambda event: self.token_hover_event(self.token_area, event)
+        self.token_view.mouseMoveEvent = lambda event: self.token_hover_event(self.token_view, event)
+
+    def token_hover_event(self, widget, event):
+        # Only remember the latest position; the lookup runs once the frame timer fires
+        self.hover_target = (widget, event.pos())
+        if not self.hover_timer.isActive():
+            self.hover_timer.start()
+
+    @traced("hover", "hover")
+    def show_token_hover(self):
+        widget, pos = self.hover_target
+        if widget is self.token_view:
+            index = self.token_view.token_at(pos)
+            text = self.token_view.text
+            tokens = self.token_view.token_layout.tokens if index >= 0 else None
+        elif self.rendered_cells is not None:
+            cursor = self.token_area.cursorForPosition(pos)
+            position = cursor.position()
+            if pos.x() < self.token_area.cursorRect(cursor).x():
+                position -= 1  # Pointer is over the character before the caret
+            index = self.rendered_cells.token_at_cell(self.rendered_utf16().from_utf16(position))
+            text = self.rendered_text
+            tokens = self.rendered_cells.tokens
+        else:
+            index = -1
 
-        if word:
-            token_info = self.get_token_info(word)
-            QToolTip.showText(self.token_area.mapToGlobal(event.pos()), token_info)
+        if index >= 0:
+            QToolTip.showText(widget.mapToGlobal(pos), self.get_token_info(text, tokens, index))
         else:
             QToolTip.hideText()
 
-    def get_token_info(self, word):
-        try:
-            token_id = self.tokenizer.convert_tokens_to_ids(word)
-            return f"Token: {word}\nID: {token_id}"
-        except:
-            return "Token information not available"
+    def setup_trace_overlay(self):
+        self.trace_overlay = QLabel(self)
+        self.trace_overlay.setStyleSheet("""
+            background-color: rgba(46, 52, 64, 230);
+            color: #ECEFF4;
+            border: 1px solid #4C566A;
+            border-radius: 4px;
+            padding: 6px;
+            font-family: 'Fira Code', 'Consolas', monospace;
+            font-size: 11px;
+        """)
+        self.trace_overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.trace_overlay.hide()
+        self.trace_timer = QTimer(self)
+        self.trace_timer.setInterval(TRACE_OVERLAY_MS)
+        self.trace_timer.timeout.connect(self.refresh_trace_overlay)
+
+    def toggle_trace_overlay(self):
+        if self.trace_overlay.isVisible():
+            self.trace_timer.stop()
+            self.trace_overlay.hide()
+            tracer.enable(bool(tracer.path))  # Keep recording if a trace file was asked for
+            return
+        tracer.enable()
+        self.refresh_trace_overlay()
+        self.trace_overlay.show()
+        self.trace_overlay.raise_()
+        self.trace_timer.start()
+
+    def refresh_trace_overlay(self):
+        lines = [f"{'stage':<16}{'count':>8}{'total ms':>11}{'mean ms':>10}{'max ms':>10}"]
+        for name, count, total, mean, peak in tracer.summary():
+            lines.append(f"{name:<16}{count:>8,}{total:>11.1f}{mean:>10.2f}{peak:>10.1f}")
+        if len(lines) == 1:
+            lines.append("Recording... tokenize something")
+        self.trace_overlay.setText("\n".join(lines))
+        self.trace_overlay.adjustSize()
+        self.trace_overlay.move(self.width() - self.trace_overlay.width() - 16, 48)
+
+    def get_token_info(self, text, tokens, index):
+        token_id, start, end = tokens[index]
+        piece = text[start:end].translate(DISPLAY_TABLE)
+        return f"Token: {piece}\nID: {token_id}\nOffsets: {start}-{end}"
 
 if __name__ == '__main__':
+    startup_timer = StartupTimer()
     app = QApplication(sys.argv)
-    window = TokenzMachine()
+    startup_timer.mark("qt_app")
+    window = TokenzMachine(startup_timer)
     window.show()
+    startup_timer.mark("window_shown")
     sys.exit(app.exec_())
\ No newline at end of file
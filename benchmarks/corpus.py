@@ -0,0 +1,32 @@
+"""Deterministic synthetic corpora for the benchmarks.
+
+Text is drawn from small word pools with a seeded generator, so the same
+size, mix and seed always give byte-identical text on any machine and no
+download is needed.
+"""
+
+import random
+
+MIXES = {
+    "ascii": ["the", "token", "machine", "splits", "text", "into", "pieces", "and", "counts", "them",
+              "quickly", "while", "users", "type", "2025", "v1.2", "e-mail", "don't", "U.S.", "(see)"],
+    "unicode": ["naïve", "café", "Übergröße", "façade", "日本語", "テキスト", "中文", "한국어", "Ελληνικά",
+                "русский", "العربية", "😀", "👍🏽", "∑x²", "—", "«quote»", "ñandú", "øre", "ß", "İstanbul"],
+    "code": ["def", "return", "self.value", "if", "else:", "for i in range(n):", "x += 1", "{", "}",
+             "foo_bar", "CamelCase", "0x1F", "->", "==", "!=", "[]", "()", "\"str\"", "# note", "\t"],
+}
+MIXES["mixed"] = MIXES["ascii"] + MIXES["unicode"] + MIXES["code"]
+
+
+def synthetic_corpus(chars, mix="mixed", seed=0):
+    """Return exactly chars characters of text from the named word pool."""
+    rng = random.Random(f"{mix}:{seed}")
+    words = MIXES[mix]
+    parts = []
+    size = 0
+    while size < chars:
+        word = rng.choice(words)
+        separator = "\n" if rng.random() < 0.08 else " "
+        parts.append(word + separator)
+        size += len(word) + 1
+    return "".join(parts)[:chars]
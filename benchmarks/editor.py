@@ -0,0 +1,144 @@
+"""Editor responsiveness on a large document.
+
+Compares the original CodeEditor gutter and current-line highlight (metrics
+looked up and numbers laid out on every paint, margins reset on every
+block count change, extra selections rebuilt on every cursor move) with
+the cached ones in Tokenizer.CodeEditor.  Measures a full repaint of the
+gutter, then scrolling a page at a time, typing (characters and new lines)
+and moving the cursor, each with the resulting repaints, on the offscreen
+Qt platform.
+
+    python benchmarks/editor.py --lines 1000000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QPainter, QTextCursor, QTextFormat
+from PyQt5.QtWidgets import QApplication, QTextEdit
+
+from Tokenizer import CodeEditor
+
+STYLE = "font-family: 'Fira Code', 'Consolas', monospace; font-size: 14px;"
+
+
+class LegacyEditor(CodeEditor):
+    # The gutter and highlight as they were before caching
+
+    def lineNumberAreaWidth(self):
+        digits = 1
+        max_value = max(1, self.blockCount() + self.firstLineNumber - 1)
+        while max_value >= 10:
+            max_value /= 10
+            digits += 1
+        return 3 + self.fontMetrics().horizontalAdvance('9') * digits
+
+    def updateLineNumberAreaWidth(self, _):
+        self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+
+    def updateLineNumberArea(self, rect, dy):
+        super().updateLineNumberArea(rect, dy)
+        if rect.contains(self.viewport().rect()):
+            self.updateLineNumberAreaWidth(0)
+
+    def lineNumberAreaPaintEvent(self, event):
+        painter = QPainter(self.lineNumberArea)
+        painter.fillRect(event.rect(), Qt.lightGray)
+        block = self.firstVisibleBlock()
+        blockNumber = block.blockNumber()
+        top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+        bottom = top + self.blockBoundingRect(block).height()
+        while block.isValid() and top <= event.rect().bottom():
+            if block.isVisible() and bottom >= event.rect().top():
+                painter.setPen(Qt.black)
+                painter.drawText(0, int(top), self.lineNumberArea.width(), self.fontMetrics().height(),
+                                 Qt.AlignRight, str(blockNumber + self.firstLineNumber))
+            block = block.next()
+            top = bottom
+            bottom = top + self.blockBoundingRect(block).height()
+            blockNumber += 1
+
+    def highlightCurrentLine(self):
+        selection = QTextEdit.ExtraSelection()
+        selection.format.setBackground(QColor(Qt.yellow).lighter(160))
+        selection.format.setProperty(QTextFormat.FullWidthSelection, True)
+        selection.cursor = self.textCursor()
+        selection.cursor.clearSelection()
+        self.setExtraSelections([selection])
+
+
+def make_editor(cls, text):
+    editor = cls()
+    editor.setStyleSheet(STYLE)
+    editor.resize(800, 900)
+    editor.show()
+    editor.setPlainText(text)
+    return editor
+
+
+def timed(app, steps, action):
+    """Median seconds per step of action followed by the repaints it causes."""
+    app.processEvents()
+    times = []
+    for step in range(steps):
+        start = time.perf_counter()
+        action(step)
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def paint_gutter(app, editor, steps):
+    return timed(app, steps, lambda step: editor.lineNumberArea.repaint())
+
+
+def scroll(app, editor, steps):
+    scroll_bar = editor.verticalScrollBar()
+    return timed(app, steps, lambda step: scroll_bar.setValue(scroll_bar.value() + scroll_bar.pageStep()))
+
+
+def type_text(app, editor, steps):
+    editor.moveCursor(QTextCursor.End)
+    # Every fourth keystroke starts a new line, which changes the block count
+    return timed(app, steps, lambda step: editor.insertPlainText("\n" if step % 4 == 3 else "x"))
+
+
+def move_cursor(app, editor, steps):
+    editor.moveCursor(QTextCursor.Start)
+    return timed(app, steps, lambda step: editor.moveCursor(QTextCursor.Down if step % 8 == 7 else QTextCursor.Right))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([])
+    text = "\n".join(f"{line:>7}: the quick brown fox jumps over the lazy dog" for line in range(args.lines))
+    results = {}
+    for name, cls in (("legacy", LegacyEditor), ("cached", CodeEditor)):
+        start = time.perf_counter()
+        editor = make_editor(cls, text)
+        app.processEvents()
+        load = time.perf_counter() - start
+        results[name] = {"gutter": paint_gutter(app, editor, args.steps), "scroll": scroll(app, editor, args.steps),
+                         "type": type_text(app, editor, args.steps), "cursor": move_cursor(app, editor, args.steps)}
+        print(f"{name:>7}: load {load:.2f} s, " + ", ".join(f"{action} {seconds * 1000:.2f} ms"
+                                                           for action, seconds in results[name].items()))
+        editor.close()
+        editor.deleteLater()
+        app.processEvents()
+    print("speedup: " + ", ".join(f"{action} {results['legacy'][action] / results['cached'][action]:.1f}x"
+                                  for action in results["legacy"]))
+
+
+if __name__ == '__main__':
+    main()
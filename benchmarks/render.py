@@ -0,0 +1,95 @@
+"""Tokens rendered per second by the QTextEdit visualization path.
+
+Compares the original per-token loop (a fresh QTextCharFormat per token,
+layout after every insert) with the batched, format-cached insert_tokens
+path used by TokenzMachine.visualize_tokens.  Runs without a display and
+without a tokenizer: the token spans are cut from synthetic text.
+
+    python benchmarks/render.py --tokens 20000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QColor, QTextCharFormat
+from PyQt5.QtWidgets import QApplication, QTextEdit
+
+from Tokenizer import insert_tokens
+from tokenz import TokenBuffer
+
+PALETTE = ["#BF616A", "#D08770", "#EBCB8B", "#A3BE8C", "#B48EAD"]
+WORDS = ["token", "machine", "naïve", "hello", "world", "<tag>", "a&b", "日本語", "42", "(x)"]
+
+
+def synthetic_tokens(count, seed=0):
+    rng = random.Random(seed)
+    words = []
+    for _ in range(count):
+        words.append(rng.choice(WORDS))
+        if rng.random() < 0.05:
+            words.append("\n")
+    text = " ".join(words)
+    spans = [match.span() for match in re.finditer(r" ?\S+|\s+", text)][:count]
+    return text, TokenBuffer.from_encoding([0] * len(spans), spans)
+
+
+def render_legacy(edit, text, tokens):
+    edit.clear()
+    cursor = edit.textCursor()
+    for i, (start, end) in enumerate(tokens.offsets()):
+        format = QTextCharFormat()
+        format.setBackground(QColor(PALETTE[i % len(PALETTE)]))
+        cursor.insertText(text[start:end], format)
+        cursor.insertText(" ")
+
+
+def render_batched(edit, text, tokens):
+    formats = []
+    for color in PALETTE:
+        format = QTextCharFormat()
+        format.setBackground(QColor(color))
+        formats.append(format)
+    edit.setUpdatesEnabled(False)
+    edit.clear()
+    insert_tokens(edit.textCursor(), text, tokens, formats)
+    edit.setUpdatesEnabled(True)
+
+
+def measure(app, edit, render, text, tokens):
+    start = time.perf_counter()
+    render(edit, text, tokens)
+    app.processEvents()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([])
+    edit = QTextEdit()
+    edit.setReadOnly(True)
+    edit.setUndoRedoEnabled(False)
+    edit.resize(600, 800)
+    edit.show()
+
+    text, tokens = synthetic_tokens(args.tokens)
+    results = {}
+    for name, render in (("legacy", render_legacy), ("batched", render_batched)):
+        seconds = min(measure(app, edit, render, text, tokens) for _ in range(args.repeat))
+        results[name] = seconds
+        print(f"{name:>8}: {len(tokens) / seconds:12,.0f} tokens/s ({seconds * 1000:.1f} ms for {len(tokens)} tokens)")
+    print(f" speedup: {results['legacy'] / results['batched']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
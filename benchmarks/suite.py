@@ -0,0 +1,257 @@
+"""Tokenization benchmark suite with JSON output for regression tracking.
+
+For every model and synthetic corpus (see ``corpus``) it measures:
+
+- tokenize: tokens/s of TokenizationWorker.run, cold tokenizer load time
+  and peak RSS, in a fresh process per case so peaks do not carry over
+- render: handle_tokenization_result through visualize_tokens and the
+  first paint, on the offscreen Qt platform
+- switch: update_tokenizer to an already-loaded model until its result
+  is on screen
+
+    python benchmarks/suite.py --models gpt2,bert-base-uncased -o results.json
+    python benchmarks/suite.py --compare results.json
+
+With ``--compare`` the run fails if any metric is more than ``--threshold``
+worse than the baseline file.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import MIXES, synthetic_corpus
+
+SWITCH_CHARS = 10000
+# Metric name -> whether higher is better
+METRICS = {"tokens_per_s": True, "load_s": False, "render_s": False, "switch_s": False}
+
+
+def peak_rss_mb():
+    # On Linux ru_maxrss survives exec, so a spawned child would report its parent's peak
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def tokenize_case(model, chars, mix, seed, repeat):
+    """Run in a fresh process: time TokenizationWorker.run on one corpus."""
+    from Tokenizer import TokenizationWorker
+    from tokenz import load_tokenizer
+
+    start = time.perf_counter()
+    tokenizer = load_tokenizer(model)
+    load_s = time.perf_counter() - start
+    text = synthetic_corpus(chars, mix, seed)
+    baseline = peak_rss_mb()
+
+    results = []
+    seconds = float("inf")
+    for _ in range(repeat):
+        worker = TokenizationWorker(tokenizer, text)
+        worker.signals.result.connect(lambda generation, tokens: results.append(tokens))
+        start = time.perf_counter()
+        worker.run()
+        seconds = min(seconds, time.perf_counter() - start)
+    tokens = results[-1]
+    peak = peak_rss_mb()
+    record = {
+        "load_s": load_s,
+        "tokenize_s": seconds,
+        "tokens": len(tokens),
+        "tokens_per_s": len(tokens) / seconds,
+        "peak_rss_mb": peak,
+        "rss_growth_mb": None if peak is None else peak - baseline,
+    }
+    return record, (tokens.ids.copy(), tokens.starts.copy(), tokens.ends.copy())
+
+
+def wait_for(app, condition, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("benchmark step did not finish")
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def make_machine(models=None):
+    """A TokenzMachine that loads nothing by itself; models replaces its model list if given."""
+    from Tokenizer import TokenzMachine
+
+    class BenchMachine(TokenzMachine):
+        def start_background_loading(self):
+            pass  # The suite loads every tokenizer itself
+
+    machine = BenchMachine()
+    machine.scheduler.cache = None  # Measure tokenization, not the result cache
+    if models:
+        machine.model_list = list(models)
+        machine.model_combo.blockSignals(True)
+        machine.model_combo.clear()
+        machine.model_combo.addItems(machine.model_list)
+        machine.model_combo.blockSignals(False)
+    machine.resize(1200, 800)
+    machine.show()
+    return machine
+
+
+def measure_render(app, machine, tokenizer, text, tokens, repeat):
+    machine.tokenizer = tokenizer
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        machine.handle_tokenization_result(tokens, text, tokenizer)
+        app.processEvents()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def measure_switch(app, machine, name, repeat):
+    text = synthetic_corpus(SWITCH_CHARS, "mixed")
+    machine.text_input.setPlainText(text)
+    other = next((model for model in machine.model_list if model != name), None)
+    seconds = float("inf")
+    for _ in range(repeat):
+        if machine.model_combo.currentText() == name:
+            if other is None:
+                return None
+            machine.model_combo.setCurrentText(other)
+            wait_for(app, lambda: not machine.scheduler.pending())
+        machine.tokens = None
+        start = time.perf_counter()
+        machine.model_combo.setCurrentText(name)
+        wait_for(app, lambda: machine.tokens is not None and not machine.scheduler.pending())
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def compare(results, baseline, threshold):
+    """Print metrics that moved past threshold; return the number of regressions."""
+    def key(record):
+        return record["model"], record["mix"], record["chars"]
+
+    previous = {key(record): record for record in baseline["results"]}
+    regressions = 0
+    for record in results["results"]:
+        old = previous.get(key(record))
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if not old.get(metric) or record.get(metric) is None:
+                continue
+            change = record[metric] / old[metric] - 1
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions += 1
+                print(f"REGRESSION {'/'.join(map(str, key(record)))} {metric}: "
+                      f"{old[metric]:.4g} -> {record[metric]:.4g} ({change:+.1%})")
+            elif -worse > threshold:
+                print(f"improved   {'/'.join(map(str, key(record)))} {metric}: "
+                      f"{old[metric]:.4g} -> {record[metric]:.4g} ({change:+.1%})")
+    return regressions
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for module in ("numpy", "tokenizers", "transformers", "PyQt5.QtCore"):
+        try:
+            imported = __import__(module, fromlist=["_"])
+        except ImportError:
+            continue
+        versions[module] = getattr(imported, "__version__", None) or getattr(imported, "PYQT_VERSION_STR", None)
+    return {"commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(), "versions": versions}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", help="comma-separated models (default: the app's model list)")
+    parser.add_argument("--sizes", default="100000,1000000", help="corpus sizes in characters")
+    parser.add_argument("--mixes", default="ascii,unicode,code", help=f"character mixes from {', '.join(MIXES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (default 0.10)")
+    args = parser.parse_args(argv)
+
+    from PyQt5.QtCore import QThreadPool
+    from PyQt5.QtWidgets import QApplication
+    from tokenz import TokenBuffer, load_tokenizer
+
+    app = QApplication.instance() or QApplication([])
+    machine = make_machine(args.models.split(",") if args.models else None)
+    models = machine.model_list
+    sizes = [int(size) for size in args.sizes.split(",")]
+    mixes = args.mixes.split(",")
+
+    results = {"meta": metadata(), "results": []}
+    context = get_context("spawn")
+    for model in models:
+        tokenizer = load_tokenizer(model)
+        machine.tokenizers.put(model, tokenizer)
+        for mix in mixes:
+            for chars in sizes:
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    record, columns = pool.submit(tokenize_case, model, chars, mix, args.seed, args.repeat).result()
+                text = synthetic_corpus(chars, mix, args.seed)
+                tokens = TokenBuffer.from_arrays(*columns)
+                record = {"model": model, "mix": mix, "chars": chars, **record,
+                          "render_s": measure_render(app, machine, tokenizer, text, tokens, args.repeat)}
+                results["results"].append(record)
+                print(f"{model} {mix} {chars:,} chars: {record['tokens_per_s']:,.0f} tokens/s, "
+                      f"render {record['render_s'] * 1000:.0f} ms, load {record['load_s']:.2f} s, "
+                      f"peak RSS {record['peak_rss_mb'] or 0:.0f} MB")
+
+    for model in models:
+        switch_s = measure_switch(app, machine, model, args.repeat)
+        for record in results["results"]:
+            if record["model"] == model:
+                record["switch_s"] = switch_s
+        if switch_s is not None:
+            print(f"{model}: switch {switch_s * 1000:.0f} ms")
+
+    # Let background workers (statistics, scheduler) finish before Qt tears down
+    machine.scheduler.pool.waitForDone()
+    QThreadPool.globalInstance().waitForDone()
+    machine.close()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
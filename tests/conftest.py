@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def tokenizer():
+    """A small byte-level BPE trained in memory, so the tests need no downloads."""
+    tokenizers = pytest.importorskip("tokenizers")
+    from tokenz import FastTokenizer
+    backend = tokenizers.Tokenizer(tokenizers.models.BPE())
+    backend.pre_tokenizer = tokenizers.pre_tokenizers.ByteLevel(add_prefix_space=False)
+    backend.decoder = tokenizers.decoders.ByteLevel()
+    trainer = tokenizers.trainers.BpeTrainer(vocab_size=400, show_progress=False,
+                                             initial_alphabet=tokenizers.pre_tokenizers.ByteLevel.alphabet())
+    backend.train_from_iterator(["the quick brown fox jumps over the lazy dog, foo bar baz 😀 🎉"] * 20, trainer)
+    return FastTokenizer(backend, "tiny")
+
+
+@pytest.fixture
+def special_tokenizer(tokenizer):
+    """The test tokenizer with a prefix and a suffix special token around every sequence."""
+    tokenizers = pytest.importorskip("tokenizers")
+    from tokenz import FastTokenizer
+    backend = tokenizers.Tokenizer.from_str(tokenizer.backend_tokenizer.to_str())
+    backend.add_special_tokens(["<s>", "</s>"])
+    backend.post_processor = tokenizers.processors.TemplateProcessing(
+        single="<s> $A </s>", special_tokens=[("<s>", backend.token_to_id("<s>")), ("</s>", backend.token_to_id("</s>"))])
+    return FastTokenizer(backend, "special")
+
+
+@pytest.fixture
+def qapp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def wait(qapp):
+    """Process Qt events until condition() holds or timeout seconds pass; returns condition()."""
+    def wait(condition, timeout=20):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            qapp.processEvents()
+            time.sleep(0.01)
+        return condition()
+    return wait
+
+
+@pytest.fixture
+def window(qapp, wait, tokenizer, tmp_path, monkeypatch):
+    """A TokenzMachine whose tokenizer cache hands out the test tokenizer for every model."""
+    monkeypatch.setenv("TOKENZ_CACHE_DIR", str(tmp_path))
+    import Tokenizer
+    from tokenz import TokenizerCache
+    monkeypatch.setattr(Tokenizer, "TokenizerCache", lambda size: TokenizerCache(size, lambda name: tokenizer))
+    window = Tokenizer.TokenzMachine()
+    window.show()
+    assert wait(lambda: window.tokenizer is not None)
+    yield window
+    window.scheduler.cancel()
+    # Workers still running would signal a deleted window
+    QtCore = pytest.importorskip("PyQt5.QtCore")
+    QtCore.QThreadPool.globalInstance().waitForDone()
+    window.close()
+    window.deleteLater()
+    qapp.processEvents()
+
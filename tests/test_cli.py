@@ -0,0 +1,17 @@
+import pytest
+
+from tokenz.cli import iter_documents
+
+
+def test_unmatched_pattern_does_not_stop_the_rest(tmp_path, capsys):
+    (tmp_path / "a.txt").write_text("first")
+    (tmp_path / "b.txt").write_text("second")
+    patterns = [str(tmp_path / "*.missing"), str(tmp_path / "a.txt"), str(tmp_path / "none-*"),
+                str(tmp_path / "b.*")]
+    documents = []
+    with pytest.raises(SystemExit) as exit_info:
+        for path, text in iter_documents(patterns, "utf-8"):
+            documents.append(text)
+    assert documents == ["first", "second"]
+    assert exit_info.value.code == 1
+    assert "*.missing" in capsys.readouterr().err
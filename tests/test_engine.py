@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from tokenz import tokenize, tokenize_stream
+
+TEXTS = [
+    "",
+    " ",
+    "the quick brown fox jumps over the lazy dog",
+    "  leading and trailing spaces   ",
+    "runs   of    spaces\n\n\nand\tTabs\t\t and  \r\n line ends\n",
+    "naïve café, 日本語のテキスト, and emoji 😀🎉 mixed 😀 in",
+    "😀" * 30 + " " + "🎉 " * 20,
+]
+WINDOW_SIZES = [1, 2, 3, 5, 16, 8192]
+
+
+def one_shot(tokenizer, text):
+    encoded = tokenizer(text, return_offsets_mapping=True)
+    return list(encoded["input_ids"]), [tuple(offsets) for offsets in encoded["offset_mapping"]]
+
+
+def windowed(tokenizer, text, window_size):
+    tokens = tokenize(tokenizer, text, window_size, batch_size=3)
+    return tokens.ids.tolist(), list(tokens.offsets())
+
+
+@pytest.fixture(params=["plain", "special"])
+def any_tokenizer(request, tokenizer, special_tokenizer):
+    return tokenizer if request.param == "plain" else special_tokenizer
+
+
+@pytest.mark.parametrize("window_size", WINDOW_SIZES)
+def test_windows_match_one_call(any_tokenizer, window_size):
+    for text in TEXTS:
+        assert windowed(any_tokenizer, text, window_size) == one_shot(any_tokenizer, text), text
+
+
+def test_random_text_matches_one_call(any_tokenizer):
+    # Whitespace and multi-byte characters land on every side of the window edges
+    rng = random.Random(0)
+    pieces = ["a", "fox", " ", "  ", "\n", "\t", "é", "日本", "😀", ",", "123"]
+    for _ in range(100):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randrange(60)))
+        window_size = rng.choice(WINDOW_SIZES[:-1])
+        assert windowed(any_tokenizer, text, window_size) == one_shot(any_tokenizer, text), (text, window_size)
+
+
+def test_stream_reports_progress_in_order(special_tokenizer):
+    text = TEXTS[5] * 4
+    consumed = [position for _, position in tokenize_stream(special_tokenizer, text, 4, batch_size=2)]
+    assert consumed == sorted(consumed) and consumed[-1] == len(text)
@@ -0,0 +1,62 @@
+import pytest
+
+from tokenz import tokenize
+
+TEXT = "😀 foo bar foo"
+
+
+@pytest.fixture
+def find_window(window, monkeypatch):
+    """The window with its Find and Replace inputs built; the dialog itself is never run."""
+    import Tokenizer
+    monkeypatch.setattr(Tokenizer.QDialog, "exec_", lambda dialog: 0)
+    window.show_find_dialog()
+    window.live_checkbox.setChecked(False)
+    window.text_input.setPlainText(TEXT)
+    return window
+
+
+def test_find_all_after_emoji(find_window):
+    find_window.find_input.setText("foo")
+    find_window.find_all_text()
+    assert find_window.text_input.textCursor().selectedText() == "foo"
+    selections = find_window.text_input.visibleMatchSelections()
+    assert [selection.cursor.selectedText() for selection in selections] == ["foo", "foo"]
+
+
+def test_replace_all_after_emoji(find_window):
+    find_window.find_input.setText("foo")
+    find_window.replace_input.setText("X")
+    find_window.replace_all_text()
+    assert find_window.text_input.toPlainText() == "😀 X bar X"
+
+
+def test_token_matches_after_emoji(find_window, wait):
+    window = find_window
+    window.calculate_and_visualize_tokens()
+    assert wait(lambda: window.tokens is not None and window.rendered_cells is not None)
+    tokens = tokenize(window.tokenizer, TEXT)
+    token_text, target = next((TEXT[start:end], index) for index, (start, end) in enumerate(tokens.offsets())
+                              if TEXT[start:end].strip() == "bar")
+    window.find_input.setText(str(int(tokens.ids[target])))
+    window.find_tokens()
+    assert wait(lambda: window.token_area.extraSelections())
+    assert [selection.cursor.selectedText() for selection in window.token_area.extraSelections()] == [token_text]
+
+
+def test_token_search_of_an_import_without_its_tokenizer(find_window, wait, tokenizer, tmp_path):
+    from tokenz import read_document, write_document
+    window = find_window
+    tokens = tokenize(tokenizer, TEXT)
+    path = tmp_path / "result.tokz"
+    write_document(str(path), tokens, TEXT, {"model": "elsewhere/model"})
+    window.handle_tokens_imported(str(path), read_document(str(path)))
+    assert window.tokens_tokenizer is None
+    # The selected model's tokenizer did not make these tokens, so text cannot be searched
+    window.find_input.setText("bar")
+    window.find_tokens()
+    assert "search by token ids" in window.statusBar().currentMessage()
+    assert not window.token_area.extraSelections()
+    window.find_input.setText(str(int(tokens.ids[0])))
+    window.find_tokens()
+    assert wait(lambda: window.token_area.extraSelections())
@@ -0,0 +1,28 @@
+from PyQt5.QtCore import QPoint
+from PyQt5.QtGui import QTextCursor
+
+from tokenz import Utf16Offsets, tokenize
+
+TEXT = "😀 🎉 😀 🎉 😀 🎉 foo bar baz"
+
+
+def test_hover_after_emoji(window, wait):
+    window.text_input.setPlainText(TEXT)
+    window.calculate_and_visualize_tokens()
+    assert wait(lambda: window.tokens is not None and window.rendered_cells is not None)
+    tokens = tokenize(window.tokenizer, TEXT)
+    target = next(index for index, (start, end) in enumerate(tokens.offsets()) if TEXT[start:end].strip() == "bar")
+    shown = []
+    window.get_token_info = lambda text, tokens, index: shown.append(index) or "info"
+
+    # Point at the middle of the token's first character, which sits after all the emoji in the token area
+    area = window.token_area
+    position = Utf16Offsets(area.toPlainText()).to_utf16(int(window.rendered_cells.cells[target]))
+    cursor = QTextCursor(area.document())
+    cursor.setPosition(position)
+    left = area.cursorRect(cursor)
+    cursor.setPosition(position + 1)
+    right = area.cursorRect(cursor)
+    window.hover_target = (area, QPoint((left.x() + right.x()) // 2, left.center().y()))
+    window.show_token_hover()
+    assert shown == [target]
@@ -0,0 +1,99 @@
+import random
+
+from tokenz import count_tokens, recount_edits, retokenize_edit, retokenize_edits, tokenize
+
+TEXT = "😀" * 20 + " ab cd ef\nthe quick 🎉 brown fox, foo bar baz\n" * 5
+
+
+def test_edit_matches_full_pass(tokenizer):
+    rng = random.Random(0)
+    text = TEXT
+    tokens = tokenize(tokenizer, text)
+    for _ in range(50):
+        position = rng.randrange(len(text) + 1)
+        removed = rng.randrange(min(4, len(text) - position) + 1)
+        added = rng.choice(["", "Q", "😀", " x", "\n"])
+        text = text[:position] + added + text[position + removed:]
+        tokens = retokenize_edit(tokenizer, tokens, text, position, removed, len(added))
+        assert list(tokens) == list(tokenize(tokenizer, text))
+
+
+def test_edits_match_full_pass(tokenizer):
+    tokens = tokenize(tokenizer, TEXT)
+    starts = [index for index in range(len(TEXT)) if TEXT.startswith("foo", index)]
+    edits = [(start, 3, 2) for start in starts]
+    text = TEXT.replace("foo", "🎉x")
+    assert list(retokenize_edits(tokenizer, tokens, text, edits)) == list(tokenize(tokenizer, text))
+
+
+def test_recount_matches_full_count(tokenizer):
+    rng = random.Random(1)
+    text = TEXT
+    count = len(tokenize(tokenizer, text))
+    for _ in range(50):
+        edits = []
+        new_text = ""
+        kept = 0
+        for position in sorted(rng.sample(range(len(text) + 1), 3)):
+            if position < kept:
+                continue
+            removed = rng.randrange(min(4, len(text) - position) + 1)
+            added = rng.choice(["", "Q", "😀", " x", "\n"])
+            edits.append((position, removed, len(added)))
+            new_text += text[kept:position] + added
+            kept = position + removed
+        new_text += text[kept:]
+        count = recount_edits(tokenizer, count, text, new_text, edits)
+        text = new_text
+        assert count == count_tokens(tokenizer, [text])[0]
+
+
+def test_typing_after_emoji_matches_full_pass(window, wait):
+    # Qt reports the change in UTF-16 units, where each emoji counts twice
+    window.live_checkbox.setChecked(True)
+    window.text_input.setPlainText(TEXT)
+    window.calculate_and_visualize_tokens()
+    assert wait(lambda: window.tokens is not None and window.tokens_text == TEXT)
+    assert wait(lambda: not window.live_full_pass and not window.scheduler.pending())
+    cursor = window.text_input.document().find("ab")
+    cursor.setPosition(cursor.selectionStart() + 1)
+    cursor.insertText("QQ")
+    text = window.text_input.toPlainText()
+    assert not window.live_full_pass
+    assert window.tokens_text == text
+    assert list(window.tokens) == list(tokenize(window.tokenizer, text))
+
+
+def test_count_only_typing_counts_the_edit(window, wait):
+    window.count_checkbox.setChecked(True)
+    window.text_input.setPlainText(TEXT)
+    window.calculate_and_visualize_tokens()
+    assert wait(lambda: window.counted is not None and window.counted[1] == TEXT)
+    assert wait(lambda: not window.live_full_pass and not window.scheduler.pending())
+    generation = window.scheduler.generation
+    cursor = window.text_input.document().find("ab")
+    cursor.setPosition(cursor.selectionStart() + 1)
+    cursor.insertText("QQ 😀")
+    text = window.text_input.toPlainText()
+    assert not window.live_full_pass
+    assert window.counted[:2] == (len(tokenize(window.tokenizer, text)), text)
+    window.refresh_live_result()
+    assert window.scheduler.generation == generation
+    assert window.result_label.text().startswith(f"Token Count: {window.counted[0]} |")
+
+
+def test_edits_with_live_update_off_are_not_spliced(window, wait):
+    # A same-length edit made while Live Update is off must not leave its old tokens behind
+    text = "foo bar baz qux"
+    window.text_input.setPlainText(text)
+    window.calculate_and_visualize_tokens()
+    assert wait(lambda: window.tokens_text == text and not window.scheduler.pending())
+    cursor = window.text_input.document().find("foo")
+    cursor.insertText("dog")
+    window.live_checkbox.setChecked(True)
+    cursor.movePosition(cursor.End)
+    cursor.insertText("!")
+    text = window.text_input.toPlainText()
+    assert text == "dog bar baz qux!"
+    assert wait(lambda: window.tokens_text == text and not window.scheduler.pending())
+    assert list(window.tokens) == list(tokenize(window.tokenizer, text))
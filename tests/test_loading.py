@@ -0,0 +1,31 @@
+import threading
+
+
+def test_only_the_selected_model_loads_by_default(window):
+    window.loader_pool.waitForDone()
+    assert window.tokenizers.names() == [window.current_model]
+
+
+def test_closing_drops_queued_loads(qapp, wait, tokenizer, tmp_path, monkeypatch):
+    import Tokenizer
+    from tokenz import TokenizerCache
+    monkeypatch.setenv("TOKENZ_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("TOKENZ_PREWARM", "1")
+    release = threading.Event()
+    loaded = []
+
+    def loader(name):
+        loaded.append(name)
+        if len(loaded) > 1:
+            release.wait(10)  # The first pre-warm load is still running when the window closes
+        return tokenizer
+    monkeypatch.setattr(Tokenizer, "TokenizerCache", lambda size: TokenizerCache(size, loader))
+    window = Tokenizer.TokenzMachine()
+    window.show()
+    assert wait(lambda: len(loaded) == 2)
+    window.close()
+    release.set()
+    window.loader_pool.waitForDone()
+    assert len(loaded) == 2
+    window.deleteLater()
+    qapp.processEvents()
@@ -0,0 +1,32 @@
+from tokenz import MappedText, tokenize
+
+
+def test_closing_a_mapped_file_releases_it(window, wait, tmp_path):
+    path = tmp_path / "large.txt"
+    path.write_text("the quick brown fox 😀 jumps over the lazy dog\n" * 2000, encoding="utf-8")
+    mapped = MappedText(str(path))
+    window.handle_file_mapped(str(path), mapped)
+    assert wait(lambda: window.tokens is not None and window.tokens_text is mapped)
+    assert list(window.tokens) == list(tokenize(window.tokenizer, str(mapped)))
+    window.clear_text()
+    assert mapped._map.closed
+    assert window.token_view.text == "" and window.rendered_cells is None
+    # Nothing still refers to the closed mapping
+    window.token_area.viewport().repaint()
+    window.token_view.viewport().repaint()
+
+
+def test_index_matches_reading_the_file(tmp_path, monkeypatch):
+    import tokenz.mapped
+    from tokenz import line_starts
+    # Small chunks, so ASCII chunks and chunks with other characters alternate
+    monkeypatch.setattr(tokenz.mapped, "_CHUNK", 64)
+    for text in ("abc def\n" * 100, "abc def\n" * 10 + "é😀 x\n" * 10 + "abc\n" * 50, "ab\r\ncd\n" * 40 + "é\r" * 20):
+        path = tmp_path / "text.txt"
+        path.write_bytes(text.encode("utf-8"))
+        mapped = MappedText(str(path))
+        expected = open(path, encoding="utf-8").read()
+        assert len(mapped) == len(expected) and mapped[:] == expected
+        assert list(mapped.line_starts) == list(line_starts(expected))
+        assert all(mapped[start:start + 7] == expected[start:start + 7] for start in range(0, len(expected), 13))
+        mapped.close()
@@ -0,0 +1,25 @@
+from tokenz.parallel import file_shards
+
+
+def check_shards(path, shard_bytes):
+    shards = file_shards(path, shard_bytes)
+    size = path.stat().st_size
+    assert shards[0][0] == 0 and shards[-1][1] == size
+    assert all(end == start for (_, end), (start, _) in zip(shards, shards[1:]))
+    assert all(start < end for start, end in shards)
+    return shards
+
+
+def test_no_safe_cut(tmp_path):
+    # Used to loop forever once the search reached the last bytes of the file
+    path = tmp_path / "words.txt"
+    path.write_text("word\n" * 40000)
+    assert check_shards(path, 100) == [(0, 200000)]
+
+
+def test_no_safe_cut_near_end(tmp_path):
+    path = tmp_path / "tail.txt"
+    path.write_text("some words here and there " * 50 + "x" * 5000)
+    shards = check_shards(path, 100)
+    assert len(shards) > 2
+    assert shards[-1][1] - shards[-1][0] > 5000
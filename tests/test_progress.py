@@ -0,0 +1,21 @@
+import pytest
+
+# Several batches of windows, so the job reports progress before its result
+TEXT = "the quick brown fox jumps over the lazy dog\n" * 8000
+
+
+@pytest.mark.parametrize("count_only", [False, True])
+def test_result_clears_the_progress(window, wait, monkeypatch, count_only):
+    import Tokenizer
+    monkeypatch.setattr(Tokenizer, "PARTIAL_INTERVAL_MS", 0)
+    messages = []
+    window.statusBar().messageChanged.connect(messages.append)
+    window.count_checkbox.setChecked(count_only)
+    window.text_input.setPlainText(TEXT)
+    window.calculate_and_visualize_tokens()
+    if count_only:
+        assert wait(lambda: window.counted is not None and window.counted[1] == TEXT)
+    else:
+        assert wait(lambda: window.tokens_text == TEXT)
+    assert any(message.startswith("Tokenization progress") for message in messages)
+    assert window.statusBar().currentMessage() == ""
@@ -0,0 +1,16 @@
+import numpy as np
+
+from tokenz import ResultCache, TokenBuffer
+
+
+def test_truncated_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    tokens = TokenBuffer()
+    tokens.extend(TokenBuffer._view(np.array([[5, 6, 7], [0, 2, 4], [2, 4, 6]], dtype=np.int32)))
+    cache.put("key", tokens, {"model": "tiny"})
+    path = tmp_path / "key.tokz"
+    data = path.read_bytes()
+    assert list(cache.get("key")[1]) == list(tokens)
+    for size in (0, 3, 10, 24, 30, len(data) - 1):
+        path.write_bytes(data[:size])
+        assert cache.get("key") is None
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+
+from tokenz import ResultCache, TokenizerCache, tokenize
+
+TEXT = "the quick brown fox 😀 jumps over the lazy dog\n" * 40
+
+
+@pytest.fixture
+def server(tmp_path, special_tokenizer):
+    from tokenz.server import TokenizationServer
+    path = str(tmp_path / "tokenz.sock")
+    loop = asyncio.new_event_loop()
+    service = TokenizationServer(TokenizerCache(1, lambda name: special_tokenizer))
+    listener = loop.run_until_complete(service.start(path=path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield "unix:" + path
+
+    async def shutdown():
+        listener.close()
+        service.close()
+        await asyncio.gather(*(batcher.task for batcher in service.batchers.values()), return_exceptions=True)
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def run_worker(special_tokenizer, server, **options):
+    import Tokenizer
+    worker = Tokenizer.TokenizationWorker(special_tokenizer, TEXT, server=server, **options)
+    emitted = {}
+    worker.signals.result.connect(lambda generation, tokens: emitted.setdefault("result", tokens))
+    worker.signals.partial.connect(lambda generation, tokens, lines: emitted.setdefault("partials", []).append(len(tokens)))
+    worker.signals.counted.connect(lambda generation, count, words: emitted.setdefault("counted", count))
+    worker.run()
+    return emitted
+
+
+def test_server_results_match_local_and_are_cached(qapp, server, special_tokenizer, tmp_path, monkeypatch):
+    import Tokenizer
+    monkeypatch.setattr(Tokenizer, "SERVER_PIECE_CHARS", 100)
+    monkeypatch.setattr(Tokenizer, "PARTIAL_INTERVAL_MS", 0)
+    cache = ResultCache(str(tmp_path / "cache"), min_chars=0)
+    expected = tokenize(special_tokenizer, TEXT)
+    emitted = run_worker(special_tokenizer, server, cache=cache)
+    assert list(emitted["result"]) == list(expected)
+    assert len(emitted["partials"]) > 1
+    assert list(cache.get(cache.key(special_tokenizer, TEXT))[1]) == list(expected)
+    assert run_worker(special_tokenizer, server, count_only=True)["counted"] == len(expected)
+
+
+def test_superseded_server_job_stops(qapp, server, special_tokenizer, monkeypatch):
+    import Tokenizer
+    monkeypatch.setattr(Tokenizer, "SERVER_PIECE_CHARS", 100)
+    checks = []
+    emitted = run_worker(special_tokenizer, server, is_current=lambda generation: checks.append(generation) or len(checks) < 3)
+    assert "result" not in emitted
+    assert len(checks) == 3
@@ -0,0 +1,33 @@
+import numpy as np
+
+from tokenz import TokenBuffer, TokenLayout, line_starts, token_stats, tokenize
+
+
+def test_line_starts():
+    for text in ("", "\n", "a\nb", "ab\n\ncd\n", "é\nx", "😀\n\nab"):
+        assert line_starts(text).tolist() == [0] + [index + 1 for index, char in enumerate(text) if char == "\n"]
+
+
+def test_layout_gives_the_same_stats(tokenizer):
+    text = "the quick brown fox\n\njumps over 😀 the lazy dog\nfoo bar baz\n"
+    tokens = tokenize(tokenizer, text)
+    # Special tokens at offset 0 around the content, as a BERT-style post-processor adds them
+    special = TokenBuffer._view(np.zeros((3, 1), dtype=np.int32))
+    wrapped = TokenBuffer()
+    for part in (special, tokens, special):
+        wrapped.extend(part)
+    for result in (tokens, wrapped):
+        expected = token_stats(result, text, len(tokenizer), 0)
+        assert token_stats(result, text, len(tokenizer), 0, layout=TokenLayout(text, result, 10)) == expected
+        assert expected["tokens"] == len(result) == sum(expected["lengths"])
+
+
+def test_stats_use_the_tokenizer_behind_the_result(window, wait):
+    text = "foo bar baz\n" * 10
+    tokens = tokenize(window.tokenizer, text)
+    # An imported result from a model that is not available has no vocabulary to compare against
+    window.handle_tokenization_result(tokens, text, None)
+    assert wait(lambda: "Distinct IDs" in window.stats_view.toPlainText())
+    assert "of vocabulary" not in window.stats_view.toPlainText()
+    window.handle_tokenization_result(tokens, text, window.tokenizer)
+    assert wait(lambda: "of vocabulary" in window.stats_view.toPlainText())
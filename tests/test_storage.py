@@ -0,0 +1,21 @@
+import mmap
+
+import pytest
+
+from tokenz import read_document
+
+
+def test_a_bad_document_is_unmapped(tmp_path, monkeypatch):
+    maps = []
+    real_mmap = mmap.mmap
+
+    def recording_mmap(*args, **kwargs):
+        maps.append(real_mmap(*args, **kwargs))
+        return maps[-1]
+    monkeypatch.setattr(mmap, "mmap", recording_mmap)
+    path = tmp_path / "bad.tokz"
+    for data in (b"x" * 64, b"TOKZ"):
+        path.write_bytes(data)
+        with pytest.raises(ValueError):
+            read_document(str(path))
+    assert len(maps) == 2 and all(mapped.closed for mapped in maps)
@@ -0,0 +1,46 @@
+from tokenz import read_document, tokenize, tokenizer_fingerprint, write_document
+
+TEXT = "the quick brown fox 😀 jumps over the lazy dog\n" * 10
+
+
+def export(window, wait, monkeypatch, path):
+    import Tokenizer
+    monkeypatch.setattr(Tokenizer.QFileDialog, "getSaveFileName", lambda *args, **kwargs: (str(path), ""))
+    window.toolbar.export_btn.click()
+    return wait(lambda: "Exported" in window.statusBar().currentMessage() or not window.statusBar().currentMessage().startswith("Exporting"))
+
+
+def test_export_describes_the_tokenizer_of_the_result(window, wait, tmp_path, monkeypatch):
+    window.text_input.setPlainText(TEXT)
+    window.calculate_and_visualize_tokens()
+    assert wait(lambda: window.tokens_text == TEXT and not window.scheduler.pending())
+    assert export(window, wait, monkeypatch, tmp_path / "result.tokz")
+    metadata, tokens, text = read_document(str(tmp_path / "result.tokz"))
+    assert metadata["model"] == window.tokens_tokenizer.name_or_path
+    assert metadata["fingerprint"] == tokenizer_fingerprint(window.tokens_tokenizer)
+    assert text == TEXT and list(tokens) == list(window.tokens)
+
+
+def test_reexport_keeps_the_metadata_of_an_import(window, wait, tokenizer, tmp_path, monkeypatch):
+    source = tmp_path / "source.tokz"
+    write_document(str(source), tokenize(tokenizer, TEXT), TEXT, {"model": "elsewhere/model", "fingerprint": "abc"})
+    window.handle_tokens_imported(str(source), read_document(str(source)))
+    assert window.tokens_tokenizer is None
+    assert export(window, wait, monkeypatch, tmp_path / "again.tokz")
+    metadata = read_document(str(tmp_path / "again.tokz"))[0]
+    assert (metadata["model"], metadata["fingerprint"]) == ("elsewhere/model", "abc")
+
+    # Without metadata or a tokenizer there is nothing true to write
+    window.tokens_metadata = None
+    export(window, wait, monkeypatch, tmp_path / "unknown.tokz")
+    assert "unknown" in window.statusBar().currentMessage()
+    assert not (tmp_path / "unknown.tokz").exists()
+
+
+def test_import_button(window, wait, tokenizer, tmp_path, monkeypatch):
+    import Tokenizer
+    source = tmp_path / "source.tokz"
+    write_document(str(source), tokenize(tokenizer, TEXT), TEXT, {"model": "elsewhere/model"})
+    monkeypatch.setattr(Tokenizer.QFileDialog, "getOpenFileName", lambda *args, **kwargs: (str(source), ""))
+    window.toolbar.import_btn.click()
+    assert wait(lambda: window.tokens_text == TEXT)
@@ -0,0 +1,38 @@
+import json
+
+from tokenz import trace
+
+
+def test_events_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace, "MAX_EVENTS", 5)
+    path = tmp_path / "trace.json"
+    tracer = trace.Tracer(str(path))
+    for step in range(12):
+        with tracer.span("step", index=step):
+            pass
+    tracer.write()
+    events = [event for event in json.loads(path.read_text())["traceEvents"] if event["ph"] == "X"]
+    assert [event["args"]["index"] for event in events] == [7, 8, 9, 10, 11]
+    assert tracer.summary()[0][:2] == ("step", 12)
+
+
+def test_no_events_without_a_file():
+    tracer = trace.Tracer()
+    tracer.enable()
+    with tracer.span("step"):
+        pass
+    assert not tracer.events
+    assert tracer.summary()[0][:2] == ("step", 1)
+
+
+def test_insert_tokens_is_the_traced_render_step(qapp, tokenizer, monkeypatch):
+    import Tokenizer
+    from PyQt5.QtWidgets import QTextEdit
+    from tokenz import tokenize
+    monkeypatch.setattr(trace.tracer, "enabled", True)
+    monkeypatch.setattr(trace.tracer, "totals", {})
+    assert Tokenizer.parse_token_query(tokenizer, "464, 3290") == [464, 3290]
+    assert not trace.tracer.totals
+    edit = QTextEdit()
+    Tokenizer.insert_tokens(edit.textCursor(), "foo bar", tokenize(tokenizer, "foo bar"))
+    assert trace.tracer.totals["insert_tokens"][0] == 1
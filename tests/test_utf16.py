@@ -0,0 +1,26 @@
+import numpy as np
+
+from tokenz import Utf16Offsets, edit_from_utf16
+
+
+def test_round_trip():
+    text = "a😀b🎉🎉c"
+    offsets = Utf16Offsets(text)
+    units = [len(text[:index].encode("utf-16-le")) // 2 for index in range(len(text) + 1)]
+    assert [offsets.to_utf16(index) for index in range(len(text) + 1)] == units
+    assert [offsets.from_utf16(unit) for unit in units] == list(range(len(text) + 1))
+    assert offsets.to_utf16(np.arange(len(text) + 1)).tolist() == units
+    assert offsets.from_utf16(2) == 1  # Inside the surrogate pair of 😀
+
+
+def test_bmp_text_is_unchanged():
+    offsets = Utf16Offsets("plain ↵ text")
+    assert offsets.astral is None
+    assert offsets.to_utf16(7) == 7
+
+
+def test_edit():
+    old = "😀😀 ab"
+    new = "😀😀 aQQb"
+    assert edit_from_utf16(old, new, 6, 0, 2) == (4, 0, 2)
+    assert edit_from_utf16(new, "😀 aQQb", 0, 2, 0) == (0, 1, 0)
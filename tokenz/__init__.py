@@ -0,0 +1,17 @@
+from .backends import BACKENDS, FastTokenizer, find_tokenizer_files
+from .buffer import TokenBuffer
+from .compare import aligned_segments, boundaries, compare_results
+from .engine import (BATCH_SIZE, WINDOW_SIZE, count_stream, count_tokens, encode_pieces, encode_windows,
+                     iter_pieces, iter_windows, next_cut, previous_cut, special_tokens, tokenize, tokenize_batch,
+                     tokenize_stream)
+from .incremental import recount_edits, retokenize_edit, retokenize_edits
+from .index import TokenIndex
+from .layout import DISPLAY_TABLE, TokenCells, TokenLayout, line_starts
+from .manager import CACHE_SIZE, TokenizerCache, load_tokenizer
+from .mapped import MappedText, next_byte_cut
+from .replace import compile_pattern, find_all, replace_all
+from .results import ResultCache, cached_tokenize, content_hash, tokenizer_fingerprint
+from .stats import token_stats
+from .storage import RecordWriter, iter_records, read_document, read_record, write_document, write_record
+from .trace import traced, tracer
+from .utf16 import Utf16Offsets, edit_from_utf16
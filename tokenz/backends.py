@@ -0,0 +1,139 @@
+"""Tokenizer backends.
+
+``load_tokenizer`` tries the backends in ``BACKENDS`` in order; each
+returns a tokenizer, or None when it cannot load the name exactly as
+``transformers`` would.
+
+``tokenizers`` reads a ``tokenizer.json`` (a local directory or file, or a
+hub model already in the Hugging Face cache) straight into a
+``tokenizers.Tokenizer``, without importing ``transformers`` or resolving
+its configuration.  It steps aside when ``tokenizer_config.json`` sets
+options that ``transformers`` would apply on top of the file.
+``transformers`` loads anything else through ``AutoTokenizer``.
+"""
+
+import json
+import os
+
+# tokenizer_config.json options transformers applies over tokenizer.json, and where the file keeps each one
+_OVERRIDES = {
+    "do_lower_case": ("normalizer", "lowercase"),
+    "strip_accents": ("normalizer", "strip_accents"),
+    "tokenize_chinese_chars": ("normalizer", "handle_chinese_chars"),
+    "add_prefix_space": ("pre_tokenizer", "add_prefix_space"),
+    "trim_offsets": ("post_processor", "trim_offsets"),
+}
+# Options that rebuild parts of the tokenizer in ways the file cannot be checked against
+_REBUILDS = ("add_bos_token", "add_eos_token", "from_slow")
+
+
+class FastTokenizer:
+    """The parts of a transformers fast tokenizer that tokenz uses, over a bare ``tokenizers.Tokenizer``.
+
+    Calls go straight to ``encode_batch`` and return the same ids and
+    offsets; ``backend_tokenizer`` is the Rust tokenizer itself.
+    """
+
+    def __init__(self, backend, name_or_path, unk_token=None):
+        # transformers turns both off unless a call asks for them
+        backend.no_truncation()
+        backend.no_padding()
+        self.backend_tokenizer = backend
+        self.name_or_path = name_or_path
+        self.unk_token = unk_token
+        self.unk_token_id = backend.token_to_id(unk_token) if unk_token else None
+
+    def __len__(self):
+        return self.backend_tokenizer.get_vocab_size(with_added_tokens=True)
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False, **_):
+        """Encode a str or a list of str; other transformers options (verbose, ...) are ignored."""
+        single = isinstance(text, str)
+        encodings = self.backend_tokenizer.encode_batch([text] if single else text,
+                                                        add_special_tokens=add_special_tokens)
+        encoded = {"input_ids": [encoding.ids for encoding in encodings]}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = [encoding.offsets for encoding in encodings]
+        if single:
+            encoded = {key: value[0] for key, value in encoded.items()}
+        return encoded
+
+    def get_vocab(self):
+        return self.backend_tokenizer.get_vocab(with_added_tokens=True)
+
+    def decode(self, ids, skip_special_tokens=False):
+        ids = [int(token_id) for token_id in ids]
+        return self.backend_tokenizer.decode(ids, skip_special_tokens=skip_special_tokens)
+
+
+def _token_content(token):
+    # Special tokens are stored as a string or as an AddedToken dict
+    return token.get("content") if isinstance(token, dict) else token
+
+
+def find_tokenizer_files(name):
+    """Return (tokenizer.json, tokenizer_config.json or None) for name, or None if there is no tokenizer.json.
+
+    A hub model counts only if it is already cached and its configuration
+    is known; nothing is downloaded.
+    """
+    if os.path.isfile(name):
+        config = os.path.join(os.path.dirname(name), "tokenizer_config.json")
+        return name, config if os.path.isfile(config) else None
+    if os.path.isdir(name):
+        path = os.path.join(name, "tokenizer.json")
+        config = os.path.join(name, "tokenizer_config.json")
+        return (path, config if os.path.isfile(config) else None) if os.path.isfile(path) else None
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return None
+    path = try_to_load_from_cache(name, "tokenizer.json")
+    config = try_to_load_from_cache(name, "tokenizer_config.json")
+    if not isinstance(path, str) or config is None:
+        return None  # Not cached, or whether the model has a configuration is unknown
+    return path, config if isinstance(config, str) else None
+
+
+def _overridden(spec, config):
+    if any(key in config for key in _REBUILDS):
+        return True
+    for key, (component, field) in _OVERRIDES.items():
+        if key in config and (spec.get(component) or {}).get(field) != config[key]:
+            return True
+    return False
+
+
+def load_fast(name):
+    """Load name with the ``tokenizers`` backend, or return None if it needs transformers."""
+    files = find_tokenizer_files(name)
+    if files is None:
+        return None
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        return None
+    path, config_path = files
+    with open(path, encoding="utf-8") as file:
+        source = file.read()
+    spec = json.loads(source)
+    config = {}
+    if config_path is not None:
+        with open(config_path, encoding="utf-8") as file:
+            config = json.load(file)
+    if _overridden(spec, config):
+        return None
+    model = spec.get("model") or {}
+    unk_token = _token_content(config.get("unk_token")) or model.get("unk_token")
+    backend = Tokenizer.from_str(source)
+    if unk_token is None and model.get("unk_id") is not None:
+        unk_token = backend.id_to_token(model["unk_id"])
+    return FastTokenizer(backend, name, unk_token)
+
+
+def load_auto(name):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(name)
+
+
+BACKENDS = {"tokenizers": load_fast, "transformers": load_auto}
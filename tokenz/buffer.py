@@ -0,0 +1,112 @@
+"""Compact storage for tokenization results.
+
+Ids, start offsets and end offsets live in the three rows of one int32
+array, so a 10M-token result takes 120 MB instead of several GB of boxed
+Python ints and tuples.  Slicing returns views that share the same memory.
+"""
+
+import numpy as np
+
+IDS, STARTS, ENDS = range(3)
+
+
+class TokenBuffer:
+    def __init__(self, capacity=0):
+        self._data = np.empty((3, capacity), dtype=np.int32)
+        self._size = 0
+
+    @classmethod
+    def from_encoding(cls, ids, offsets, shift=0):
+        buffer = cls(len(ids))
+        buffer.append(ids, offsets, shift)
+        return buffer
+
+    @classmethod
+    def from_arrays(cls, ids, starts, ends):
+        buffer = cls(len(ids))
+        buffer._data[IDS] = ids
+        buffer._data[STARTS] = starts
+        buffer._data[ENDS] = ends
+        buffer._size = len(ids)
+        return buffer
+
+    @classmethod
+    def _view(cls, data):
+        buffer = cls.__new__(cls)
+        buffer._data = data
+        buffer._size = data.shape[1]
+        return buffer
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._size)
+            if step != 1:
+                raise ValueError("TokenBuffer slices must be contiguous")
+            return self._view(self._data[:, start:max(start, stop)])
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("token index out of range")
+        token_id, start, end = self._data[:, index].tolist()
+        return token_id, start, end
+
+    def __iter__(self):
+        return zip(*self._data[:, :self._size].tolist())
+
+    @property
+    def ids(self):
+        return self._data[IDS, :self._size]
+
+    @property
+    def starts(self):
+        return self._data[STARTS, :self._size]
+
+    @property
+    def ends(self):
+        return self._data[ENDS, :self._size]
+
+    @property
+    def nbytes(self):
+        return self._size * 3 * self._data.itemsize
+
+    def offsets(self):
+        return zip(self.starts.tolist(), self.ends.tolist())
+
+    def reserve(self, capacity):
+        if capacity <= self._data.shape[1]:
+            return
+        data = np.empty((3, max(capacity, 2 * self._data.shape[1])), dtype=np.int32)
+        data[:, :self._size] = self._data[:, :self._size]
+        self._data = data
+
+    def append(self, ids, offsets, shift=0):
+        count = len(ids)
+        if not count:
+            return
+        self.reserve(self._size + count)
+        block = self._data[:, self._size:self._size + count]
+        block[IDS] = ids
+        block[STARTS:] = np.asarray(offsets, dtype=np.int32).reshape(count, 2).T
+        if shift:
+            block[STARTS:] += shift
+        self._size += count
+
+    def extend(self, other, shift=0):
+        count = len(other)
+        if not count:
+            return
+        self.reserve(self._size + count)
+        block = self._data[:, self._size:self._size + count]
+        block[:] = other._data[:, :count]
+        if shift:
+            block[STARTS:] += shift
+        self._size += count
+
+    def shift(self, delta, start=0, stop=None):
+        self._data[STARTS:, start:self._size if stop is None else stop] += delta
+
+    def to_dict(self):
+        return {"input_ids": self.ids.tolist(), "offset_mapping": list(self.offsets())}
@@ -0,0 +1,222 @@
+"""Headless batch tokenization.
+
+    python -m tokenz count  [-m MODEL] [-j N] [PATH ...]
+    python -m tokenz encode [-m MODEL] [-j N] [--format jsonl|binary] [-o OUTPUT] [PATH ...]
+    python -m tokenz serve  [-m MODEL ...] [--port PORT | --socket PATH]
+
+PATH may be a file, a directory (read recursively) or a glob pattern;
+``-`` or no PATH reads stdin.  Output is one JSON line per document, or
+``.tokz`` records (see ``storage``) with ``--format binary``.  Nothing
+here imports PyQt5; the tokenization is the same streaming engine the GUI
+worker uses.  ``-j N`` spreads the work over N processes (see ``parallel``).
+Results for large documents are kept in the on-disk cache (see ``results``)
+unless ``--no-cache`` is given.  ``serve`` keeps tokenizers loaded for
+other processes (see ``server``).
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from .engine import count_tokens, tokenize_stream
+from .manager import load_tokenizer
+from .parallel import ProcessTokenizer
+from .results import ResultCache, cached_tokenize, file_content_hash
+from .server import BATCH_WINDOW, DEFAULT_PORT, MAX_PENDING, serve
+from .storage import RecordWriter, write_record
+
+DEFAULT_MODEL = "gpt2"
+
+
+def iter_paths(patterns, unmatched=None):
+    """Yield the files patterns name; a pattern matching nothing is reported and added to unmatched."""
+    for pattern in patterns or ["-"]:
+        if pattern == "-":
+            yield pattern
+            continue
+        matches = sorted(glob.glob(pattern, recursive=True)) if any(c in pattern for c in "*?[") else [pattern]
+        if not matches:
+            print(f"tokenz: no files match {pattern!r}", file=sys.stderr)
+            if unmatched is not None:
+                unmatched.append(pattern)
+            continue
+        for match in matches:
+            if os.path.isdir(match):
+                for root, dirs, files in os.walk(match):
+                    dirs.sort()
+                    for name in sorted(files):
+                        yield os.path.join(root, name)
+            else:
+                yield match
+
+
+def read_text(path, encoding):
+    if path == "-":
+        return sys.stdin.read()
+    with open(path, 'r', encoding=encoding) as file:
+        return file.read()
+
+
+def iter_documents(patterns, encoding):
+    """Yield (path, text), reporting unreadable inputs on stderr instead of stopping."""
+    unmatched = []
+    errors = 0
+    for path in iter_paths(patterns, unmatched):
+        try:
+            yield path, read_text(path, encoding)
+        except (OSError, UnicodeDecodeError) as error:
+            print(f"tokenz: {path}: {error}", file=sys.stderr)
+            errors += 1
+    if errors or unmatched:
+        raise SystemExit(1)
+
+
+def lookup_files(cache, fingerprint, paths, encoding):
+    """Return {path: (key, hit)} for files that can be looked up without decoding them."""
+    found = {}
+    if cache is None or encoding.replace("_", "-").lower() not in ("utf-8", "utf8"):
+        return found
+    for path in paths:
+        try:
+            if path == "-" or os.path.getsize(path) < cache.min_chars:
+                continue
+            text_hash = file_content_hash(path)
+        except OSError:
+            continue  # Reported when the workers try to read it
+        if text_hash is not None:
+            key = cache.key_for(fingerprint, text_hash)
+            found[path] = (key, cache.get(key))
+    return found
+
+
+def count_text(cache, tokenizer, text):
+    """Token count of text from a cached result if there is one, else counted without offsets."""
+    if cache is not None and cache.wants(text):
+        hit = cache.get(cache.key(tokenizer, text))
+        if hit is not None:
+            return len(hit[1])
+    return count_tokens(tokenizer, [text])[0]
+
+
+def iter_results(args, count_only=False):
+    """Yield (path, tokens, characters) for every readable input; with count_only, tokens is just their count."""
+    cache = None if args.no_cache else ResultCache()
+    if args.processes == 1:
+        tokenizer = load_tokenizer(args.model)
+        for path, text in iter_documents(args.paths, args.encoding):
+            if count_only:
+                yield path, count_text(cache, tokenizer, text), len(text)
+                continue
+            metadata = {"path": path, "model": args.model, "characters": len(text)}
+            yield path, cached_tokenize(cache, tokenizer, text, metadata), len(text)
+        return
+
+    unmatched = []
+    paths = list(iter_paths(args.paths, unmatched))
+    errors = len(unmatched)
+    with ProcessTokenizer(args.model, args.processes) as pool:
+        found = lookup_files(cache, pool.fingerprint, paths, args.encoding)
+        hits = {path: hit for path, (_, hit) in found.items() if hit is not None}
+        remaining = [path for path in paths if path != "-" and path not in hits]
+        files = pool.count_files(remaining, args.encoding) if count_only else pool.map_files(remaining, args.encoding)
+        for path in paths:
+            if path == "-":
+                text = sys.stdin.read()
+                yield path, pool.count(text) if count_only else pool.tokenize(text), len(text)
+                continue
+            if path in hits:
+                metadata, tokens = hits[path]
+                yield path, len(tokens) if count_only else tokens, metadata["characters"]
+                continue
+            _, tokens, characters, error = next(files)
+            if error:
+                print(f"tokenz: {path}: {error}", file=sys.stderr)
+                errors += 1
+                continue
+            if path in found and not count_only:
+                cache.put(found[path][0], tokens, {"path": path, "model": args.model, "characters": characters})
+            yield path, tokens, characters
+    if errors:
+        raise SystemExit(1)
+
+
+def open_output(path, binary):
+    if path in (None, "-"):
+        return sys.stdout.buffer if binary else sys.stdout
+    return open(path, 'wb' if binary else 'w', encoding=None if binary else "utf-8")
+
+
+def count(args, output):
+    # Counting never builds offsets, and a counted result is not worth caching
+    for path, tokens, characters in iter_results(args, count_only=True):
+        output.write(json.dumps({"path": path, "model": args.model, "tokens": tokens,
+                                 "characters": characters}, ensure_ascii=False) + "\n")
+
+
+def stream_records(args, output):
+    # Nothing needs a whole result without the cache, so blocks go to disk as they are encoded
+    tokenizer = load_tokenizer(args.model)
+    for path, text in iter_documents(args.paths, args.encoding):
+        with RecordWriter(output, {"path": path, "model": args.model, "characters": len(text)}) as writer:
+            for block, _ in tokenize_stream(tokenizer, text):
+                writer.write(block)
+
+
+def encode(args, output):
+    if args.format == "binary" and args.processes == 1 and args.no_cache and output.seekable():
+        stream_records(args, output)
+        return
+    for path, tokens, characters in iter_results(args):
+        if args.format == "binary":
+            write_record(output, tokens, {"path": path, "model": args.model, "characters": characters})
+        else:
+            record = {"path": path, "model": args.model, "tokens": len(tokens)}
+            record.update(tokens.to_dict())
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m tokenz", description="Tokenize files without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("count", "print token counts"), ("encode", "write token ids and offsets")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("paths", nargs="*", metavar="PATH",
+                             help="file, directory or glob pattern; '-' or nothing reads stdin")
+        command.add_argument("-m", "--model", default=DEFAULT_MODEL, help=f"tokenizer to use (default {DEFAULT_MODEL})")
+        command.add_argument("-o", "--output", help="output file (default stdout)")
+        command.add_argument("--encoding", default="utf-8", help="input text encoding (default utf-8)")
+        command.add_argument("-j", "--processes", type=int, default=1,
+                             help="worker processes; 0 uses every core (default 1)")
+        command.add_argument("--no-cache", action="store_true", help="do not read or write the result cache")
+        if name == "encode":
+            command.add_argument("--format", choices=("jsonl", "binary"), default="jsonl")
+    command = commands.add_parser("serve", help="keep tokenizers loaded and serve them over HTTP")
+    command.add_argument("-m", "--model", action="append", default=[],
+                         help="tokenizer to load at startup; may be repeated (others load on first use)")
+    command.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    command.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default {DEFAULT_PORT})")
+    command.add_argument("--socket", help="listen on this Unix socket instead of a TCP port")
+    command.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW * 1000,
+                         help=f"how long to gather requests into one batch (default {BATCH_WINDOW * 1000:g})")
+    command.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                         help=f"texts queued per model before requests get 503 (default {MAX_PENDING})")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        serve(args.host, args.port, args.socket, args.model, args.batch_window_ms / 1000, args.max_pending)
+        return
+    binary = getattr(args, "format", "jsonl") == "binary"
+    args.processes = args.processes or os.cpu_count() or 1
+    output = open_output(args.output, binary)
+    try:
+        {"count": count, "encode": encode}[args.command](args, output)
+    finally:
+        if output not in (sys.stdout, sys.stdout.buffer):
+            output.close()
+        else:
+            output.flush()
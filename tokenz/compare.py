@@ -0,0 +1,59 @@
+"""Compare how several tokenizers split the same text.
+
+Token boundaries are compared by where tokens end, which lines up
+tokenizers that attach whitespace to the next token (gpt2, roberta) with
+ones that drop it (bert).  Everything is NumPy set operations on the end
+offsets, so comparing multi-million-token results is cheap next to
+producing them.
+"""
+
+from functools import reduce
+
+import numpy as np
+
+
+def boundaries(tokens):
+    """Sorted character offsets where tokens end; zero-width special tokens are ignored."""
+    ends = tokens.ends
+    return np.unique(ends[ends > tokens.starts])
+
+
+def compare_results(results, text_length):
+    """Return (rows, common) for {name: tokens} results of the same text.
+
+    Each row is a dict with the token count, characters per token, the
+    share of the model's boundaries that every model agrees on and how
+    many of its boundaries no other model has.  common holds the
+    boundaries shared by all models.
+    """
+    bounds = {name: boundaries(tokens) for name, tokens in results.items()}
+    common = reduce(np.intersect1d, bounds.values()) if bounds else np.empty(0, dtype=np.int32)
+    rows = []
+    for name, tokens in results.items():
+        others = [other for other_name, other in bounds.items() if other_name != name]
+        unique = np.setdiff1d(bounds[name], reduce(np.union1d, others), assume_unique=True) if others else bounds[name][:0]
+        rows.append({
+            "model": name,
+            "tokens": len(tokens),
+            "chars_per_token": text_length / len(tokens) if len(tokens) else 0.0,
+            "agreement": len(common) / len(bounds[name]) if len(bounds[name]) else 1.0,
+            "unique_boundaries": len(unique),
+        })
+    return rows, common
+
+
+def aligned_segments(text, tokens, common, limit):
+    """Yield (piece, shared) for text[:limit] cut at the model's boundaries.
+
+    shared tells whether the boundary closing the piece is one every model
+    has, so the differences stand out when the models are listed together.
+    """
+    bounds = boundaries(tokens)
+    bounds = bounds[bounds <= limit]
+    start = 0
+    for end, shared in zip(bounds.tolist(), np.isin(bounds, common).tolist()):
+        if end > start:
+            yield text[start:end], shared
+            start = end
+    if start < min(limit, len(text)):
+        yield text[start:min(limit, len(text))], True
@@ -0,0 +1,219 @@
+"""Streaming tokenization shared by the GUI worker and headless tools.
+
+The text is cut into large windows at positions where every tokenizer in the
+model list starts a new pre-token, the windows are encoded in batches by the
+fast tokenizer, and the special tokens are added once around the whole
+stream.  The concatenated result is identical to a single
+``tokenizer(text, return_offsets_mapping=True)`` call.
+"""
+
+import re
+
+from .buffer import TokenBuffer
+from .trace import tracer
+
+WINDOW_SIZE = 8192
+BATCH_SIZE = 16
+
+# A single space between two non-space characters is a pre-token boundary for
+# the ByteLevel (gpt2, roberta), BERT and Metaspace (t5) pre-tokenizers, and
+# nothing on either side of it changes how the other side is split.
+_SAFE_CUT = re.compile(r"(?<=\S) (?=\S)")
+
+
+def _is_safe_cut(text, pos):
+    return (0 < pos < len(text) - 1 and text[pos] == " "
+            and not text[pos - 1].isspace() and not text[pos + 1].isspace())
+
+
+def _find_cut(text, lo, hi):
+    # Prefer the last safe cut in (lo, hi] so windows stay within budget
+    pos = text.rfind(" ", lo + 1, hi + 1)
+    while pos > lo:
+        if _is_safe_cut(text, pos):
+            return pos
+        pos = text.rfind(" ", lo + 1, pos)
+    # Otherwise grow the window up to the next safe cut, if there is one
+    match = _SAFE_CUT.search(text, hi)
+    return match.start() if match else None
+
+
+def previous_cut(text, pos):
+    """Return the last safe cut at or before pos, or 0 if there is none."""
+    pos = text.rfind(" ", 0, pos + 1)
+    while pos > 0:
+        if _is_safe_cut(text, pos):
+            return pos
+        pos = text.rfind(" ", 0, pos)
+    return 0
+
+
+def next_cut(text, pos):
+    """Return the first safe cut at or after pos, or len(text) if there is none."""
+    match = _SAFE_CUT.search(text, max(pos, 1))
+    return match.start() if match else len(text)
+
+
+def iter_windows(text, window_size=WINDOW_SIZE, start=0, end=None):
+    """Yield (start, end) spans of text[start:end] cut at safe boundaries."""
+    end = len(text) if end is None else end
+    while start < end:
+        if end - start <= window_size:
+            yield start, end
+            return
+        cut = _find_cut(text, start, start + window_size)
+        if cut is None or cut >= end:
+            yield start, end
+            return
+        yield start, cut
+        start = cut
+
+
+def special_tokens(tokenizer):
+    """Return the (prefix, suffix) ids the tokenizer adds around one sequence."""
+    plain = tokenizer("a", add_special_tokens=False)["input_ids"]
+    full = tokenizer("a", add_special_tokens=True)["input_ids"]
+    for i in range(len(full) - len(plain) + 1):
+        if full[i:i + len(plain)] == plain:
+            return full[:i], full[i + len(plain):]
+    return [], []
+
+
+def iter_pieces(text, window_size=WINDOW_SIZE):
+    """Yield (start, piece) windows of a str, or of anything providing iter_pieces."""
+    if not isinstance(text, str):
+        return text.iter_pieces(window_size)
+    return ((start, text[start:end]) for start, end in iter_windows(text, window_size))
+
+
+def _backend(tokenizer):
+    # The Rust tokenizer, when encoding with it directly gives exactly what calling tokenizer would
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None and backend.truncation is None and backend.padding is None:
+        return backend
+    return None
+
+
+def _encode(tokenizer, pieces):
+    """Return (ids, offsets) for each piece, without special tokens."""
+    backend = _backend(tokenizer)
+    if backend is not None:
+        # Skips building a BatchEncoding of Python lists that is only read once
+        return [(encoding.ids, encoding.offsets) for encoding in backend.encode_batch(pieces, add_special_tokens=False)]
+    encoded = tokenizer(pieces, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+    return list(zip(encoded["input_ids"], encoded["offset_mapping"]))
+
+
+def encode_pieces(tokenizer, pieces):
+    """Encode a batch of (start, piece) windows in one call into a TokenBuffer with absolute offsets."""
+    with tracer.span("encode", "engine", windows=len(pieces)) as span:
+        encoded = _encode(tokenizer, [piece for _, piece in pieces])
+        block = TokenBuffer(sum(len(ids) for ids, _ in encoded))
+        for (start, _), (ids, offsets) in zip(pieces, encoded):
+            block.append(ids, offsets, start)
+        span.set(tokens=len(block))
+    return block
+
+
+def encode_windows(tokenizer, text, windows):
+    """Encode a batch of (start, end) windows of text in one call."""
+    return encode_pieces(tokenizer, [(start, text[start:end]) for start, end in windows])
+
+
+def _special_block(ids):
+    return TokenBuffer.from_encoding(ids, [(0, 0)] * len(ids))
+
+
+def tokenize_stream(tokenizer, text, window_size=WINDOW_SIZE, batch_size=BATCH_SIZE):
+    """Yield (TokenBuffer, consumed_chars) blocks in text order.
+
+    text is a str or a ``MappedText``, which is decoded one window at a time.
+    """
+    prefix, suffix = special_tokens(tokenizer)
+    if prefix:
+        yield _special_block(prefix), 0
+
+    batch = []
+    for piece in iter_pieces(text, window_size):
+        batch.append(piece)
+        if len(batch) == batch_size:
+            yield encode_pieces(tokenizer, batch), batch[-1][0] + len(batch[-1][1])
+            batch = []
+    if batch:
+        yield encode_pieces(tokenizer, batch), batch[-1][0] + len(batch[-1][1])
+
+    if suffix:
+        yield _special_block(suffix), len(text)
+
+
+def _iter_owned_pieces(texts, window_size, batch_size):
+    # Batches of (text index, start, piece) across texts, so short texts share encode calls
+    batch = []
+    for owner, text in enumerate(texts):
+        for start, piece in iter_pieces(text, window_size):
+            batch.append((owner, start, piece))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def tokenize_batch(tokenizer, texts, window_size=WINDOW_SIZE, batch_size=BATCH_SIZE):
+    """Tokenize several texts with their windows packed into shared encode calls.
+
+    Returns one TokenBuffer per text, each equal to ``tokenize(tokenizer, text)``.
+    """
+    prefix, suffix = special_tokens(tokenizer)
+    results = [TokenBuffer() for _ in texts]
+    for tokens in results:
+        tokens.extend(_special_block(prefix))
+    for batch in _iter_owned_pieces(texts, window_size, batch_size):
+        with tracer.span("encode", "engine", windows=len(batch)):
+            encoded = _encode(tokenizer, [piece for _, _, piece in batch])
+            for (owner, start, _), (ids, offsets) in zip(batch, encoded):
+                results[owner].append(ids, offsets, start)
+    for tokens in results:
+        tokens.extend(_special_block(suffix))
+    return results
+
+
+def _piece_counts(tokenizer, pieces):
+    backend = _backend(tokenizer)
+    if backend is not None:
+        # Encodings convert ids and offsets to Python lists only on access; len() needs neither
+        return [len(encoding) for encoding in backend.encode_batch(pieces, add_special_tokens=False)]
+    encoded = tokenizer(pieces, add_special_tokens=False, return_attention_mask=False, verbose=False)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def count_tokens(tokenizer, texts, window_size=WINDOW_SIZE, batch_size=BATCH_SIZE, add_special_tokens=True):
+    """Return the token count of each text without building offsets."""
+    prefix, suffix = special_tokens(tokenizer) if add_special_tokens else ([], [])
+    counts = [len(prefix) + len(suffix)] * len(texts)
+    for batch in _iter_owned_pieces(texts, window_size, batch_size):
+        with tracer.span("count", "engine", windows=len(batch)):
+            for (owner, _, _), count in zip(batch, _piece_counts(tokenizer, [piece for _, _, piece in batch])):
+                counts[owner] += count
+    return counts
+
+
+def count_stream(tokenizer, text, window_size=WINDOW_SIZE, batch_size=BATCH_SIZE):
+    """Yield (token_count, consumed_chars) per batch like tokenize_stream, without offsets."""
+    prefix, suffix = special_tokens(tokenizer)
+    if prefix:
+        yield len(prefix), 0
+    for batch in _iter_owned_pieces([text], window_size, batch_size):
+        with tracer.span("count", "engine", windows=len(batch)):
+            count = sum(_piece_counts(tokenizer, [piece for _, _, piece in batch]))
+        yield count, batch[-1][1] + len(batch[-1][2])
+    if suffix:
+        yield len(suffix), len(text)
+
+
+def tokenize(tokenizer, text, window_size=WINDOW_SIZE, batch_size=BATCH_SIZE):
+    """Tokenize text through the streaming engine into one TokenBuffer."""
+    tokens = TokenBuffer()
+    for block, _ in tokenize_stream(tokenizer, text, window_size, batch_size):
+        tokens.extend(block)
+    return tokens
@@ -0,0 +1,99 @@
+"""Re-tokenize only the parts of a document touched by edits.
+
+Safe cuts (see ``engine``) split a tokenization into independent pieces,
+so after an edit the tokens before the last safe cut ahead of it and after
+the first safe cut behind it are still valid.  Only the text between those
+two cuts is encoded again and spliced between the kept tokens.  Several
+edits (a Replace All) each get their own span; spans whose cuts overlap are
+merged, and all of them are encoded in one batch.  A count is updated the
+same way, from the counts of each span before and after the edits.
+"""
+
+import numpy as np
+
+from .buffer import TokenBuffer
+from .engine import WINDOW_SIZE, count_tokens, encode_windows, iter_windows, next_cut, previous_cut, special_tokens
+from .trace import traced
+
+
+def retokenize_edit(tokenizer, tokens, text, position, removed, added, window_size=WINDOW_SIZE):
+    """Return the tokens of text after `removed` chars at position were replaced by `added` chars.
+
+    tokens is the result for the text before the edit, produced with the same
+    tokenizer; text is the document after the edit.
+    """
+    return retokenize_edits(tokenizer, tokens, text, [(position, removed, added)], window_size)
+
+
+def _edited_spans(text, edits):
+    # (left, right, shift) per span of the new text to encode again; shift is the total delta up to its end
+    spans = []
+    shift = 0
+    for position, removed, added in edits:
+        position += shift
+        # Both cuts need their neighbouring characters outside the edited span,
+        # so they are safe cuts of the old text as well as the new one
+        left = previous_cut(text, position - 2) if position >= 2 else 0
+        right = next_cut(text, position + added + 1)
+        shift += added - removed
+        if spans and left <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], right)
+            spans[-1][2] = shift
+        else:
+            spans.append([left, right, shift])
+    return spans
+
+
+@traced("retokenize_edit", "engine")
+def retokenize_edits(tokenizer, tokens, text, edits, window_size=WINDOW_SIZE):
+    """Return the tokens of text after edits, (position, removed, added) in old-text positions.
+
+    The edits are sorted and do not overlap; text is the document after all
+    of them and tokens the result for the document before.
+    """
+    prefix, suffix = special_tokens(tokenizer)
+    content = tokens[len(prefix):len(tokens) - len(suffix)]
+    spans = _edited_spans(text, edits)
+    if not spans:
+        return tokens
+
+    lefts = np.array([left for left, _, _ in spans], dtype=np.int64)
+    rights = np.array([right for _, right, _ in spans], dtype=np.int64)
+    shifts = np.array([shift for _, _, shift in spans], dtype=np.int64)
+    shifts_before = np.concatenate(([0], shifts[:-1]))
+    # One vectorised search per column instead of one per span
+    keep_lefts = np.searchsorted(content.starts, lefts - shifts_before)
+    keep_rights = np.searchsorted(content.starts, rights - shifts)
+    keep_rights[rights >= len(text)] = len(content)
+
+    windows = [window for left, right, _ in spans for window in iter_windows(text, window_size, left, right)]
+    encoded = encode_windows(tokenizer, text, windows) if windows else TokenBuffer()
+    firsts = np.searchsorted(encoded.starts, lefts)
+    lasts = np.append(firsts[1:], len(encoded))
+
+    result = TokenBuffer(len(tokens) + int((rights - lefts).sum()))
+    result.extend(tokens[:len(prefix)])
+    kept = 0
+    for keep_left, keep_right, first, last, shift_before, shift in zip(
+            keep_lefts.tolist(), keep_rights.tolist(), firsts.tolist(), lasts.tolist(), shifts_before.tolist(),
+            shifts.tolist()):
+        result.extend(content[kept:keep_left], shift_before)
+        result.extend(encoded[first:last])
+        kept = keep_right
+    result.extend(content[kept:], int(shifts[-1]))
+    result.extend(tokens[len(tokens) - len(suffix):])
+    return result
+
+
+@traced("recount_edit", "engine")
+def recount_edits(tokenizer, count, old_text, text, edits, window_size=WINDOW_SIZE):
+    """Return the token count of text after edits, given count, the count of old_text.
+
+    edits are as for ``retokenize_edits``; only the edited spans are counted, without offsets.
+    """
+    spans = _edited_spans(text, edits)
+    shifts_before = [0] + [shift for _, _, shift in spans[:-1]]
+    new = [text[left:right] for left, right, _ in spans]
+    old = [old_text[left - shift_before:right - shift] for (left, right, shift), shift_before in zip(spans, shifts_before)]
+    counts = count_tokens(tokenizer, new + old, window_size, add_special_tokens=False)
+    return count + sum(counts[:len(new)]) - sum(counts[len(new):])
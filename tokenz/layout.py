@@ -0,0 +1,136 @@
+"""Fixed-width grid layout for token visualization.
+
+Every source line of the text starts a new row.  Within a line the tokens
+follow each other separated by one blank cell and wrap at ``columns``.  All
+positions are kept in NumPy arrays, so finding what is on a given row or
+under a given cell is a couple of binary searches regardless of how many
+tokens the document holds.
+"""
+
+import numpy as np
+
+# Control characters would break the one-character-per-cell grid
+DISPLAY_TABLE = str.maketrans({"\n": "↵", "\r": "←", "\t": "→"})
+# Tokens per step of the cell prefix sum; small enough for the temporaries to stay in cache
+_CHUNK = 1 << 16
+
+
+def line_starts(text):
+    if not isinstance(text, str):
+        return text.line_starts  # MappedText keeps its own index
+    if text.isascii():
+        # One byte per character: find the newlines in the encoded bytes
+        breaks = np.flatnonzero(np.frombuffer(text.encode("ascii"), dtype=np.uint8) == 10)
+        starts = np.empty(len(breaks) + 1, dtype=np.int64)
+        starts[0] = 0
+        np.add(breaks, 1, out=starts[1:])
+        return starts
+    lengths = np.fromiter(map(len, text.split("\n")), dtype=np.int64)
+    starts = np.empty(len(lengths), dtype=np.int64)
+    starts[0] = 0
+    np.cumsum(lengths[:-1] + 1, out=starts[1:])
+    return starts
+
+
+class TokenCells:
+    """Where each token lands when drawn as its text followed by one separator.
+
+    This is the flat rendering used by the QTextEdit visualization, so a
+    document position maps back to its token with one binary search.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        starts, ends = tokens.starts, tokens.ends
+        # Every cell is a character or a separator; int32 halves the memory traffic when that fits
+        last_cell = len(tokens) + (int(ends.max()) if len(tokens) else 0)
+        dtype = np.int32 if last_cell < 2 ** 31 else np.int64
+        self.cells = np.empty(len(tokens) + 1, dtype=dtype)
+        self.cells[0] = 0
+        for lo in range(0, len(tokens), _CHUNK):
+            # Widths in place, carrying the previous chunk's total in the first one
+            cells = self.cells[lo + 1:lo + 1 + _CHUNK]
+            np.subtract(ends[lo:lo + _CHUNK], starts[lo:lo + _CHUNK], out=cells)
+            cells += 1
+            cells[0] += self.cells[lo]
+            np.cumsum(cells, out=cells)
+
+    def _cell_index(self, cell, side="left"):
+        # A key of another dtype would make searchsorted convert the whole array
+        cell = min(cell, np.iinfo(self.cells.dtype).max)
+        return int(np.searchsorted(self.cells, self.cells.dtype.type(cell), side=side))
+
+    def token_at_cell(self, cell):
+        """Return the index of the token covering cell, or -1 on a separator."""
+        index = self._cell_index(cell, "right") - 1
+        if 0 <= index < len(self.tokens) and cell < self.cells[index + 1] - 1:
+            return index
+        return -1
+
+
+class TokenLayout(TokenCells):
+    def __init__(self, text, tokens, columns=80, lines=None):
+        """lines, if given, are the precomputed line_starts of the part of text to lay out."""
+        super().__init__(tokens)
+        starts = tokens.starts
+
+        lines = line_starts(text) if lines is None else lines
+        # Offsets are sorted apart from trailing special tokens at offset 0
+        content = len(starts)
+        while content and starts[content - 1] == 0 and tokens.ends[content - 1] == 0:
+            content -= 1
+        self.line_first = np.empty(len(lines) + 1, dtype=np.int64)
+        # Keys of the offsets' dtype, or searchsorted would convert all of them
+        self.line_first[:-1] = np.searchsorted(starts[:content], lines.astype(starts.dtype, copy=False))
+        # The trailing special tokens stay on the last line with content; lines after it are empty
+        self.line_first[:-1][self.line_first[:-1] == content] = len(starts)
+        self.line_first[0] = 0
+        self.line_first[-1] = len(starts)
+        self.set_columns(columns)
+
+    def set_columns(self, columns):
+        self.columns = max(1, columns)
+        line_cells = np.diff(self.cells[self.line_first])
+        rows = np.maximum(1, -(-line_cells // self.columns))
+        self.row_starts = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(rows, out=self.row_starts[1:])
+
+    @property
+    def row_count(self):
+        return int(self.row_starts[-1])
+
+    def row_of(self, index):
+        """Return the first row on which token index is drawn."""
+        line = int(np.searchsorted(self.line_first, index, side="right")) - 1
+        return int(self.row_starts[line]) + int(self.cells[index] - self.cells[self.line_first[line]]) // self.columns
+
+    def _row_cells(self, row):
+        line = int(np.searchsorted(self.row_starts, row, side="right")) - 1
+        lo = int(self.cells[self.line_first[line]]) + (row - int(self.row_starts[line])) * self.columns
+        return line, lo, lo + self.columns
+
+    def row_fragments(self, row):
+        """Yield (token_index, column, text_start, text_end) for each token piece on row."""
+        if not 0 <= row < self.row_count:
+            return
+        line, lo, hi = self._row_cells(row)
+        first = max(self._cell_index(lo, "right") - 1, int(self.line_first[line]))
+        last = min(self._cell_index(hi), int(self.line_first[line + 1]))
+        starts = self.tokens.starts
+        for index in range(first, last):
+            cell = int(self.cells[index])
+            begin = max(cell, lo)
+            end = min(int(self.cells[index + 1]) - 1, hi)
+            if begin < end:
+                start = int(starts[index])
+                yield index, begin - lo, start + begin - cell, start + end - cell
+
+    def token_at(self, row, column):
+        """Return the index of the token drawn at (row, column), or -1."""
+        if not 0 <= row < self.row_count or not 0 <= column < self.columns:
+            return -1
+        line, lo, _ = self._row_cells(row)
+        index = self.token_at_cell(lo + column)
+        if not self.line_first[line] <= index < self.line_first[line + 1]:
+            return -1
+        return index
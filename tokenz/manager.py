@@ -0,0 +1,88 @@
+"""Size-bounded LRU cache of loaded tokenizers.
+
+Loading goes through ``load_tokenizer`` (which picks a backend, see
+``backends``) unless another loader is given.  Concurrent requests for
+the same name share one load, so pre-warming on a background thread and a
+user switching models never load a model twice.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from .backends import BACKENDS
+from .trace import tracer
+
+CACHE_SIZE = 4
+
+
+def load_tokenizer(name, backends=None):
+    """Load name with the first backend that can (see ``backends``).
+
+    backends is a list of ``BACKENDS`` names, by default the
+    comma-separated TOKENZ_BACKEND or all of them in order.
+    """
+    backends = backends or [backend for backend in os.environ.get("TOKENZ_BACKEND", "").split(",") if backend]
+    with tracer.span("load_tokenizer", "loader", model=name) as span:
+        for backend in backends or BACKENDS:
+            if backend not in BACKENDS:
+                raise ValueError(f"unknown tokenizer backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+            tokenizer = BACKENDS[backend](name)
+            if tokenizer is not None:
+                span.set(backend=backend)
+                return tokenizer
+    raise OSError(f"none of the {', '.join(backends or BACKENDS)} backends can load {name}")
+
+
+class TokenizerCache:
+    def __init__(self, max_size=CACHE_SIZE, loader=load_tokenizer):
+        self.max_size = max_size
+        self.loader = loader
+        self._tokenizers = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._tokenizers
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tokenizers)
+
+    def names(self):
+        """Cached names, least recently used first."""
+        with self._lock:
+            return list(self._tokenizers)
+
+    def peek(self, name):
+        """Return the cached tokenizer (marking it recently used) or None."""
+        with self._lock:
+            tokenizer = self._tokenizers.get(name)
+            if tokenizer is not None:
+                self._tokenizers.move_to_end(name)
+            return tokenizer
+
+    def put(self, name, tokenizer):
+        with self._lock:
+            self._tokenizers[name] = tokenizer
+            self._tokenizers.move_to_end(name)
+            while len(self._tokenizers) > self.max_size:
+                self._tokenizers.popitem(last=False)
+
+    def get(self, name):
+        """Return the tokenizer for name, loading it on this thread if needed."""
+        tokenizer = self.peek(name)
+        if tokenizer is not None:
+            return tokenizer
+        with self._lock:
+            load_lock = self._loading.setdefault(name, threading.Lock())
+        with load_lock:
+            tokenizer = self.peek(name)
+            if tokenizer is None:
+                tokenizer = self.loader(name)
+                self.put(name, tokenizer)
+        with self._lock:
+            if self._loading.get(name) is load_lock:
+                del self._loading[name]
+        return tokenizer
@@ -0,0 +1,177 @@
+"""Read-only, memory-mapped text for files too large to load.
+
+A MappedText behaves like a str for the operations the tokenizer worker and
+the views need (``len``, slicing, line starts) while the bytes stay in the
+file mapping; only the slices being encoded or drawn are ever decoded.  An
+index of line starts and of a checkpoint every few KB maps character offsets
+back to byte offsets.  Newlines are translated as when reading the file in
+text mode, so offsets match ``open(path).read()``.  The file must be UTF-8.
+The text may also start at a byte offset and run to the end of the file, as
+in a ``.tokz`` document (see ``storage``).
+"""
+
+import mmap
+
+import numpy as np
+
+from .engine import WINDOW_SIZE, _is_safe_cut
+
+CHECKPOINT = 4096
+# Offsets are stored as int32 in a TokenBuffer
+MAX_CHARS = 2 ** 31 - 1
+_CHUNK = 1 << 22
+
+
+def next_byte_cut(data, pos):
+    """Return the first byte offset >= pos of a safe-cut space in UTF-8 data, or len(data).
+
+    A space byte is always a whole character in UTF-8, so only its
+    neighbours need decoding.
+    """
+    index = data.find(b" ", max(pos, 1))
+    while index != -1:
+        before = bytes(data[max(0, index - 4):index]).decode("utf-8", "ignore")[-1:]
+        after = bytes(data[index + 1:index + 5]).decode("utf-8", "ignore")[:1]
+        if before and after and _is_safe_cut(before + " " + after, 1):
+            return index
+        index = data.find(b" ", index + 1)
+    return len(data)
+
+
+def _merge(a, b):
+    # Sorted union of two disjoint sorted position arrays; usually one is empty
+    if not len(b):
+        return a
+    if not len(a):
+        return b
+    return np.sort(np.concatenate((a, b)))
+
+
+def _decode(data):
+    return data.decode("utf-8", "replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class MappedText:
+    def __init__(self, path, offset=0):
+        self.path = path
+        with open(path, 'rb') as file:
+            # An empty file cannot be mapped
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if file.seek(0, 2) else b""
+        self._base = min(offset, len(self._map))
+        self._block = None
+        self._words = None
+        self._build_index()
+        if self._length > MAX_CHARS:
+            self.close()
+            raise ValueError(f"{path} has more than {MAX_CHARS} characters")
+
+    def _build_index(self):
+        data = np.frombuffer(self._map, dtype=np.uint8)[self._base:]
+        line_bytes, line_chars = [np.zeros(1, np.int64)], [np.zeros(1, np.int64)]
+        mark_bytes, mark_chars = [], []
+        chars = 0
+        plain = self._map.find(b"\r", self._base) == -1
+        for lo in range(0, len(data), _CHUNK):
+            chunk = data[lo:lo + _CHUNK]
+            if plain and chunk.max() < 0x80:
+                # ASCII without CR: every byte is a character, so only the newlines need finding
+                breaks = np.flatnonzero(chunk == 10)
+                line_bytes.append(lo + breaks + 1)
+                line_chars.append(chars + breaks + 1)
+                marks = np.arange(0, len(chunk), CHECKPOINT)
+                mark_bytes.append(lo + marks)
+                mark_chars.append(chars + marks)
+                chars += len(chunk)
+                continue
+            returns = np.flatnonzero(chunk == 13)
+            following = data[np.minimum(lo + returns + 1, len(data) - 1)]
+            cr_lf = returns[(following == 10) & (lo + returns + 1 < len(data))]
+            # Continuation bytes and the CR of CR LF do not start a character of the decoded text
+            continuation = np.flatnonzero((chunk & 0xC0) == 0x80)
+            skipped = _merge(continuation, cr_lf)
+
+            breaks = _merge(np.flatnonzero(chunk == 10), np.setdiff1d(returns, cr_lf, assume_unique=True))
+            line_bytes.append(lo + breaks + 1)
+            line_chars.append(chars + breaks + 1 - np.searchsorted(skipped, breaks + 1))
+
+            # Checkpoints must start a character and not split CR LF
+            invalid = np.zeros(len(chunk) + 1, dtype=bool)
+            invalid[continuation] = True
+            invalid[cr_lf + 1] = True
+            if lo and chunk[0] == 10 and data[lo - 1] == 13:
+                invalid[0] = True
+            marks = np.arange(0, len(chunk), CHECKPOINT)
+            for _ in range(4):
+                marks += invalid[marks]
+            marks = marks[(marks < len(chunk)) & ~invalid[marks]]
+            mark_bytes.append(lo + marks)
+            mark_chars.append(chars + marks - np.searchsorted(skipped, marks))
+            chars += len(chunk) - len(skipped)
+
+        self._length = chars
+        self.line_bytes = np.concatenate(line_bytes)
+        self.line_starts = np.concatenate(line_chars)
+        self._mark_bytes = np.concatenate(mark_bytes or [np.zeros(1, np.int64)])
+        self._mark_chars = np.concatenate(mark_chars or [np.zeros(1, np.int64)])
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._block = None
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def size(self):
+        return len(self._map) - self._base
+
+    @property
+    def line_count(self):
+        return len(self.line_starts)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            if index < 0:
+                index += self._length
+            return self[index:index + 1]
+        start, stop, step = index.indices(self._length)
+        if step != 1:
+            raise ValueError("MappedText slices must be contiguous")
+        if start >= stop:
+            return ""
+        first = int(np.searchsorted(self._mark_chars, start, side="right")) - 1
+        last = int(np.searchsorted(self._mark_chars, stop))
+        # Views draw many short pieces from the same few KB; keep the last block decoded
+        if self._block is None or self._block[:2] != (first, last):
+            begin = self._base + int(self._mark_bytes[first])
+            end = self._base + (int(self._mark_bytes[last]) if last < len(self._mark_bytes) else self.size)
+            self._block = (first, last, _decode(self._map[begin:end]))
+        base = int(self._mark_chars[first])
+        return self._block[2][start - base:stop - base]
+
+    def __str__(self):
+        return self[:]
+
+    def iter_pieces(self, window_size=WINDOW_SIZE):
+        """Yield (char_start, text) windows cut at safe boundaries, decoding one at a time."""
+        chars = words = 0
+        pos = 0
+        base = self._base
+        while pos < self.size:
+            end = self.size
+            if pos + window_size < self.size:
+                end = next_byte_cut(self._map, base + pos + window_size) - base
+            piece = _decode(self._map[base + pos:base + end])
+            yield chars, piece
+            # Safe cuts never split a word, so the counts add up
+            words += len(piece.split())
+            chars += len(piece)
+            pos = end
+        self._words = words
+
+    def word_count(self):
+        if self._words is None:
+            for _ in self.iter_pieces():
+                pass
+        return self._words
@@ -0,0 +1,212 @@
+"""Multi-process tokenization for corpus-scale jobs.
+
+Each worker process loads the tokenizer once and encodes shards: slices of
+an in-memory text, or byte ranges of a UTF-8 file that the worker reads
+itself.  Shards are cut at safe cuts (see ``engine``), so the merged result
+is identical to a single-process run.  A worker writes its ids and offsets
+into a shared-memory block and returns only the block's name; the parent
+copies the block into the result and releases it, so no token lists are
+pickled between processes.
+"""
+
+import codecs
+import mmap
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .buffer import TokenBuffer
+from .engine import BATCH_SIZE, WINDOW_SIZE, count_tokens, encode_windows, iter_windows, special_tokens
+from .manager import load_tokenizer
+from .mapped import next_byte_cut
+from .results import tokenizer_fingerprint
+
+SHARD_SIZE = 1 << 20
+# Encodings in which a space byte is always a whole character
+_BYTE_SHARDED = {"utf-8", "utf-8-sig", "ascii"}
+
+_tokenizer = None
+
+
+def _init_worker(model):
+    global _tokenizer
+    # One process per core already; the Rust thread pool would only oversubscribe
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    _tokenizer = load_tokenizer(model)
+
+
+def _special_tokens():
+    return special_tokens(_tokenizer)
+
+
+def _fingerprint():
+    return tokenizer_fingerprint(_tokenizer)
+
+
+def _read_shard(path, start, end, encoding):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    # Same newline handling as reading the file in text mode
+    return data.decode(encoding).replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _encode_shard(job):
+    kind, key, last = job[:3]
+    if kind == "error":
+        return key, last, None, 0, 0, job[3]
+    try:
+        if kind == "file":
+            text = _read_shard(*job[3:])
+        else:
+            text = job[3]
+        tokens = TokenBuffer()
+        batch = []
+        for window in iter_windows(text, WINDOW_SIZE):
+            batch.append(window)
+            if len(batch) == BATCH_SIZE:
+                tokens.extend(encode_windows(_tokenizer, text, batch))
+                batch = []
+        if batch:
+            tokens.extend(encode_windows(_tokenizer, text, batch))
+    except (OSError, UnicodeDecodeError) as error:
+        return key, last, None, 0, 0, str(error)
+
+    count = len(tokens)
+    block = shared_memory.SharedMemory(create=True, size=max(1, 3 * count * 4))
+    try:
+        np.ndarray((3, count), dtype=np.int32, buffer=block.buf)[:] = tokens._data[:, :count]
+    finally:
+        block.close()
+    return key, last, block.name, count, len(text), None
+
+
+def _count_shard(job):
+    kind, key, last = job[:3]
+    if kind == "error":
+        return key, last, 0, 0, job[3]
+    try:
+        text = _read_shard(*job[3:]) if kind == "file" else job[3]
+    except (OSError, UnicodeDecodeError) as error:
+        return key, last, 0, 0, str(error)
+    return key, last, count_tokens(_tokenizer, [text], add_special_tokens=False)[0], len(text), None
+
+
+def _take_block(name, count, tokens, shift):
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = np.ndarray((3, count), dtype=np.int32, buffer=block.buf)
+        tokens.extend(TokenBuffer._view(data), shift)
+        del data
+    finally:
+        block.close()
+        block.unlink()
+
+
+def file_shards(path, shard_bytes=SHARD_SIZE):
+    """Return (start, end) byte ranges of a UTF-8 file cut at safe cuts."""
+    size = os.path.getsize(path)
+    if size <= shard_bytes:
+        return [(0, size)]
+    shards = []
+    start = 0
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        while start < size:
+            end = next_byte_cut(data, start + shard_bytes) if start + shard_bytes < size else size
+            shards.append((start, end))
+            start = end
+    return shards
+
+
+class ProcessTokenizer:
+    """Pool of worker processes that each hold one loaded tokenizer."""
+
+    def __init__(self, model, processes=None, shard_size=SHARD_SIZE):
+        self.model = model
+        self.shard_size = shard_size
+        context = multiprocessing.get_context("spawn")
+        self.pool = context.Pool(processes, initializer=_init_worker, initargs=(model,))
+        self.prefix, self.suffix = self.pool.apply(_special_tokens)
+        self.fingerprint = self.pool.apply(_fingerprint)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def _finish(self, tokens):
+        result = TokenBuffer(len(self.prefix) + len(tokens) + len(self.suffix))
+        result.append(self.prefix, [(0, 0)] * len(self.prefix))
+        result.extend(tokens)
+        result.append(self.suffix, [(0, 0)] * len(self.suffix))
+        return result
+
+    def tokenize(self, text):
+        """Tokenize one in-memory text across the pool."""
+        jobs = [("text", start, False, text[start:end]) for start, end in iter_windows(text, self.shard_size)]
+        tokens = TokenBuffer()
+        for start, _, name, count, _, _ in self.pool.imap(_encode_shard, jobs):
+            _take_block(name, count, tokens, start)
+        return self._finish(tokens)
+
+    def count(self, text):
+        """Count the tokens of one in-memory text across the pool, without offsets."""
+        jobs = [("text", start, False, text[start:end]) for start, end in iter_windows(text, self.shard_size)]
+        counts = self.pool.imap(_count_shard, jobs)
+        return len(self.prefix) + sum(count for _, _, count, _, _ in counts) + len(self.suffix)
+
+    def _file_jobs(self, paths, encoding):
+        sharded = codecs.lookup(encoding).name in _BYTE_SHARDED
+        for path in paths:
+            try:
+                shards = file_shards(path, self.shard_size if sharded else float("inf"))
+            except OSError as error:
+                yield "error", path, True, str(error)
+                continue
+            for index, (start, end) in enumerate(shards):
+                yield "file", path, index == len(shards) - 1, path, start, end, encoding
+
+    def map_files(self, paths, encoding="utf-8"):
+        """Yield (path, TokenBuffer or None, characters, error) per file, in order.
+
+        Shards of all files share the pool, so many small files parallelise as
+        well as one large one.  Files in other encodings than UTF-8 are
+        encoded as a single shard.
+        """
+        tokens = TokenBuffer()
+        chars = 0
+        error = None
+        shards = self.pool.imap(_encode_shard, self._file_jobs(paths, encoding))
+        for path, last, name, count, length, shard_error in shards:
+            if name is not None:
+                _take_block(name, count, tokens, chars)
+                chars += length
+            error = error or shard_error
+            if last:
+                yield path, None if error else self._finish(tokens), chars, error
+                tokens = TokenBuffer()
+                chars = 0
+                error = None
+
+    def count_files(self, paths, encoding="utf-8"):
+        """Yield (path, token count or None, characters, error) per file, in order, like map_files."""
+        total = 0
+        chars = 0
+        error = None
+        shards = self.pool.imap(_count_shard, self._file_jobs(paths, encoding))
+        for path, last, count, length, shard_error in shards:
+            total += count
+            chars += length
+            error = error or shard_error
+            if last:
+                yield path, None if error else len(self.prefix) + total + len(self.suffix), chars, error
+                total = 0
+                chars = 0
+                error = None
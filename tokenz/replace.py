@@ -0,0 +1,42 @@
+"""Find and replace over a whole document in one pass.
+
+Matches come from a single ``re`` scan of the text, with plain strings
+escaped into a pattern, so finding or replacing every occurrence is one
+pass in C however many there are.  ``replace_all`` builds the new text in
+the same scan and reports each replacement as an edit for
+``retokenize_edits``.
+"""
+
+import re
+
+import numpy as np
+
+
+def compile_pattern(pattern, regex=False, case_sensitive=True):
+    """Compile a search string; raises re.error if regex is set and pattern is invalid."""
+    return re.compile(pattern if regex else re.escape(pattern), 0 if case_sensitive else re.IGNORECASE)
+
+
+def find_all(text, pattern, regex=False, case_sensitive=True):
+    """Return (starts, ends): int64 offsets of every non-empty match, in order."""
+    spans = compile_pattern(pattern, regex, case_sensitive).finditer(text)
+    offsets = np.fromiter((offset for match in spans if match.end() > match.start() for offset in match.span()),
+                          dtype=np.int64)
+    return offsets[0::2], offsets[1::2]
+
+
+def replace_all(text, pattern, replacement, regex=False, case_sensitive=True):
+    """Replace every match; returns (new_text, edits).
+
+    edits lists (position, removed, added) per replacement, in positions of
+    the original text.  With regex, replacement may refer to groups
+    (``\\1``, ``\\g<name>``); otherwise it is inserted as is.
+    """
+    edits = []
+
+    def substitute(match):
+        value = match.expand(replacement) if regex else replacement
+        edits.append((match.start(), match.end() - match.start(), len(value)))
+        return value
+
+    return compile_pattern(pattern, regex, case_sensitive).sub(substitute, text), edits
@@ -0,0 +1,187 @@
+"""Persistent cache of tokenization results.
+
+Results are stored as one ``.tokz`` record per file (see ``storage``) under
+a key derived from the text's content hash and a fingerprint of the
+tokenizer: its name, the ``tokenizers`` version, its full serialized
+configuration and the special tokens it adds.  Hits are memory-mapped, so
+reopening a large document costs a hash of its text rather than a
+tokenization.  The directory is kept under ``max_bytes`` by evicting the
+least recently used entries.
+"""
+
+import hashlib
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import weakref
+
+from .engine import special_tokens, tokenize
+from .storage import read_record, write_record
+from .trace import traced
+
+CACHE_BYTES = 1 << 30
+# Shorter texts tokenize faster than a cache lookup is worth
+MIN_CHARS = 1 << 16
+SUFFIX = ".tokz"
+
+_fingerprints = weakref.WeakKeyDictionary()
+
+
+def default_directory():
+    return os.environ.get("TOKENZ_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "tokenz")
+
+
+def content_hash(text):
+    """Hash of a str, a MappedText or raw UTF-8 bytes; equal content gives equal hashes."""
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        digest.update(text)
+    elif isinstance(text, str):
+        digest.update(text.encode("utf-8", "surrogatepass"))
+    else:
+        for _, piece in text.iter_pieces(1 << 20):
+            digest.update(piece.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def file_content_hash(path, chunk_size=1 << 20):
+    """content_hash of a UTF-8 file read in text mode, or None if its bytes differ from its text.
+
+    Files without carriage returns decode to exactly their bytes, so they
+    can be hashed without decoding.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            if b"\r" in chunk:
+                return None
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tokenizer_fingerprint(tokenizer):
+    """Identify everything about a tokenizer that can change its output."""
+    try:
+        return _fingerprints[tokenizer]
+    except (KeyError, TypeError):
+        pass
+    digest = hashlib.blake2b(digest_size=20)
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    parts = [getattr(tokenizer, "name_or_path", ""), getattr(sys.modules.get("tokenizers"), "__version__", ""),
+             backend.to_str() if backend is not None else repr(sorted(tokenizer.get_vocab().items())),
+             repr(special_tokens(tokenizer))]
+    for part in parts:
+        digest.update(part.encode("utf-8") + b"\0")
+    fingerprint = digest.hexdigest()
+    try:
+        _fingerprints[tokenizer] = fingerprint
+    except TypeError:
+        pass
+    return fingerprint
+
+
+class ResultCache:
+    def __init__(self, directory=None, max_bytes=CACHE_BYTES, min_chars=MIN_CHARS):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self.min_chars = min_chars
+        self._lock = threading.Lock()
+
+    def wants(self, text):
+        return len(text) >= self.min_chars
+
+    @traced("cache_key", "cache")
+    def key(self, tokenizer, text):
+        return self.key_for(tokenizer_fingerprint(tokenizer), content_hash(text))
+
+    @staticmethod
+    def key_for(fingerprint, text_hash):
+        return hashlib.blake2b(f"{fingerprint}:{text_hash}".encode(), digest_size=20).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    @traced("cache_get", "cache")
+    def get(self, key):
+        """Return (metadata, tokens) cached for key, with tokens mapped read-only, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            metadata, tokens, _ = read_record(data)
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):
+            return None
+        return metadata, tokens
+
+    @traced("cache_put", "cache")
+    def put(self, key, tokens, metadata=None):
+        """Store tokens under key and evict old entries past max_bytes."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            try:
+                with os.fdopen(handle, 'wb') as file:
+                    write_record(file, tokens, metadata)
+                os.replace(temp_path, self._path(key))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as error:
+            print(f"Could not cache tokenization result: {error}", file=sys.stderr)
+            return
+        self.evict()
+
+    def entries(self):
+        """Return (mtime, size, path) for every entry, least recently used first."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if name.endswith(SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue  # Still mapped on Windows; try again next time
+                total -= size
+
+    def clear(self):
+        self.evict(0)
+
+
+def cached_tokenize(cache, tokenizer, text, metadata=None):
+    """tokenize() through cache, which may be None."""
+    if cache is None or not cache.wants(text):
+        return tokenize(tokenizer, text)
+    key = cache.key(tokenizer, text)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit[1]
+    tokens = tokenize(tokenizer, text)
+    cache.put(key, tokens, metadata)
+    return tokens
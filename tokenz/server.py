@@ -0,0 +1,323 @@
+"""Local tokenization service.
+
+    python -m tokenz serve [--host HOST] [--port PORT | --socket PATH] [-m MODEL ...]
+
+One process keeps tokenizers loaded (see ``manager``) and serves every
+tool on the machine over HTTP/1.1, on a TCP port or a Unix socket:
+
+    GET  /health     {"status": "ok", "models": [loaded names]}
+    POST /count      {"model": ..., "text": ...} or {"model": ..., "texts": [...]}
+    POST /tokenize   the same; answers with ids and offsets, or with a
+                     ``.tokz`` record (see ``storage``) when the request
+                     accepts application/x-tokz
+
+Requests for the same model that arrive within ``batch_window`` of each
+other are coalesced: their windows are packed into shared encode calls on
+a thread pool while the event loop keeps accepting connections.  Each
+model queues at most ``max_pending`` texts; past that the server answers
+503 with Retry-After instead of buffering without bound.  Counting never
+builds offsets (see ``engine.count_tokens``).
+"""
+
+import asyncio
+import http.client
+import io
+import json
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .engine import count_tokens, tokenize_batch
+from .manager import CACHE_SIZE, TokenizerCache
+from .storage import read_record, write_record
+
+DEFAULT_PORT = 8765
+# How long a batch waits for more requests after its first one
+BATCH_WINDOW = 0.005
+# Texts are only packed into one batch up to this many characters in total
+BATCH_CHARS = 1 << 20
+# Texts waiting per model before new requests are turned away
+MAX_PENDING = 1024
+MAX_BODY = 256 * 1024 * 1024
+TOKZ_TYPE = "application/x-tokz"
+
+
+class Overloaded(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Batcher:
+    """Queue of texts for one model, encoded in coalesced batches one batch at a time."""
+
+    def __init__(self, tokenizers, name, executor, batch_window=BATCH_WINDOW, max_pending=MAX_PENDING):
+        self.tokenizers = tokenizers
+        self.name = name
+        self.executor = executor
+        self.batch_window = batch_window
+        self.queue = asyncio.Queue(max_pending)
+        self.task = asyncio.ensure_future(self._run())
+
+    def submit(self, text, count_only):
+        """Return a future for the text's count or TokenBuffer; raises Overloaded if the queue is full."""
+        future = asyncio.get_event_loop().create_future()
+        try:
+            self.queue.put_nowait((text, count_only, future))
+        except asyncio.QueueFull:
+            raise Overloaded(f"{self.name}: {self.queue.maxsize} texts already waiting") from None
+        return future
+
+    async def _collect(self):
+        loop = asyncio.get_event_loop()
+        batch = [await self.queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.batch_window
+        while size < BATCH_CHARS:
+            remaining = deadline - loop.time()
+            if remaining <= 0 and self.queue.empty():
+                break
+            try:
+                item = self.queue.get_nowait() if remaining <= 0 else await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = await self._collect()
+            batch = [item for item in batch if not item[2].done()]  # Drop requests whose client went away
+            try:
+                tokenizer = await loop.run_in_executor(self.executor, self.tokenizers.get, self.name)
+                for count_only, function in ((True, count_tokens), (False, tokenize_batch)):
+                    items = [item for item in batch if item[1] == count_only]
+                    if items:
+                        results = await loop.run_in_executor(self.executor, function, tokenizer,
+                                                             [text for text, _, _ in items])
+                        for (_, _, future), result in zip(items, results):
+                            if not future.done():
+                                future.set_result(result)
+            except Exception as error:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def close(self):
+        self.task.cancel()
+
+
+class TokenizationServer:
+    def __init__(self, tokenizers=None, batch_window=BATCH_WINDOW, max_pending=MAX_PENDING, workers=None):
+        # An empty cache is falsy, so no "or" here
+        self.tokenizers = tokenizers if tokenizers is not None else TokenizerCache(CACHE_SIZE)
+        self.batch_window = batch_window
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(workers or os.cpu_count() or 1, thread_name_prefix="tokenz-serve")
+        self.batchers = {}
+
+    def batcher(self, name):
+        if name not in self.batchers:
+            self.batchers[name] = Batcher(self.tokenizers, name, self.executor, self.batch_window, self.max_pending)
+        return self.batchers[name]
+
+    async def preload(self, names):
+        loop = asyncio.get_event_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, self.tokenizers.get, name) for name in names))
+
+    async def handle(self, method, path, body, accept):
+        """Return (status, content type, payload bytes) for one request."""
+        if path == "/health" and method == "GET":
+            return 200, "application/json", json.dumps({"status": "ok", "models": self.tokenizers.names()}).encode()
+        if path not in ("/count", "/tokenize"):
+            raise HTTPError(404, f"no such endpoint: {path}")
+        if method != "POST":
+            raise HTTPError(405, f"{path} takes POST")
+        try:
+            request = json.loads(body)
+            name = request["model"]
+            texts = request["texts"] if "texts" in request else [request["text"]]
+        except (ValueError, KeyError, TypeError) as error:
+            raise HTTPError(400, f"expected JSON with model and text or texts: {error}")
+        if not isinstance(name, str) or not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise HTTPError(400, "model and texts must be strings")
+
+        count_only = path == "/count"
+        batcher = self.batcher(name)
+        futures = []
+        try:
+            for text in texts:
+                futures.append(batcher.submit(text, count_only))
+            results = await asyncio.gather(*futures)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        if count_only:
+            counts = results if "texts" in request else results[0]
+            return 200, "application/json", json.dumps({"model": name, "tokens": counts}).encode()
+        if TOKZ_TYPE in accept:
+            output = io.BytesIO()
+            for tokens in results:
+                write_record(output, tokens, {"model": name})
+            return 200, TOKZ_TYPE, output.getvalue()
+        records = []
+        for tokens in results:
+            record = {"model": name, "tokens": len(tokens)}
+            record.update(tokens.to_dict())
+            records.append(record)
+        return 200, "application/json", json.dumps(records if "texts" in request else records[0]).encode()
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                extra = {}
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY:
+                        raise HTTPError(413, f"request body over {MAX_BODY} bytes")
+                    body = await reader.readexactly(length)
+                    status, content_type, payload = await self.handle(method, urlsplit(target).path, body,
+                                                                      headers.get("accept", ""))
+                except HTTPError as error:
+                    status, content_type, payload = error.status, "application/json", _error(error)
+                except Overloaded as error:
+                    status, content_type, payload = 503, "application/json", _error(error)
+                    extra["Retry-After"] = "1"
+                except asyncio.IncompleteReadError:
+                    break
+                except ValueError as error:
+                    status, content_type, payload = 400, "application/json", _error(error)
+                except Exception as error:
+                    status, content_type, payload = 500, "application/json", _error(error)
+                close = headers.get("connection", "").lower() == "close" or request_line.endswith(b"HTTP/1.0\r\n")
+                head = [f"HTTP/1.1 {status} {http.client.responses.get(status, '')}",
+                        f"Content-Type: {content_type}", f"Content-Length: {len(payload)}"]
+                head += [f"{key}: {value}" for key, value in extra.items()]
+                if close:
+                    head.append("Connection: close")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()  # Slow readers hold back their own connection, not the server
+                if close:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT, path=None):
+        if path:
+            if os.path.exists(path):
+                os.unlink(path)  # A socket left over from a previous run
+            return await asyncio.start_unix_server(self.serve_connection, path)
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+        self.executor.shutdown(wait=False)
+
+
+def _error(error):
+    return json.dumps({"error": str(error)}).encode()
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, path=None, models=(), batch_window=BATCH_WINDOW,
+          max_pending=MAX_PENDING):
+    """Run the service until interrupted."""
+    async def main():
+        server = TokenizationServer(batch_window=batch_window, max_pending=max_pending)
+        try:
+            listener = await server.start(host, port, path)
+            await server.preload(models)
+            print(f"tokenz: serving on {path or f'http://{host}:{port}'}", flush=True)
+            async with listener:
+                await listener.serve_forever()
+        finally:
+            server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class TokenizerClient:
+    """Blocking client for a running service.
+
+    address is ``http://host:port`` or ``unix:/path/to/socket``.  One client
+    keeps one connection; use one client per thread.
+    """
+
+    def __init__(self, address, timeout=300):
+        if address.startswith("unix:"):
+            self.connection = _UnixConnection(address[len("unix:"):], timeout)
+        else:
+            url = urlsplit(address if "//" in address else "http://" + address)
+            self.connection = http.client.HTTPConnection(url.hostname, url.port or DEFAULT_PORT, timeout=timeout)
+
+    def _request(self, method, path, payload=None, accept="application/json"):
+        body = None if payload is None else json.dumps(payload).encode()
+        headers = {"Accept": accept, "Content-Type": "application/json"}
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (ConnectionError, http.client.HTTPException):
+            self.connection.close()
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"{path}: {response.status} {json.loads(data).get('error', '')}")
+        return data
+
+    def health(self):
+        return json.loads(self._request("GET", "/health"))
+
+    def count(self, model, text):
+        return json.loads(self._request("POST", "/count", {"model": model, "text": text}))["tokens"]
+
+    def count_many(self, model, texts):
+        return json.loads(self._request("POST", "/count", {"model": model, "texts": texts}))["tokens"]
+
+    def tokenize(self, model, text):
+        """Return the text's TokenBuffer, transferred as a binary record."""
+        data = self._request("POST", "/tokenize", {"model": model, "text": text}, TOKZ_TYPE)
+        return read_record(data)[1]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
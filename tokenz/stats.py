@@ -0,0 +1,81 @@
+"""Summary statistics of a tokenization, computed over the id and offset arrays.
+
+Every figure is a handful of vectorised passes (bincount, argpartition,
+searchsorted); nothing here loops over tokens in Python.  The per-token
+passes run a cache-sized chunk at a time, and a TokenLayout of the
+result, when there is one, already knows where every line starts.
+"""
+
+import numpy as np
+
+from .layout import line_starts
+
+TOP_K = 20
+# Token lengths at or above this share the last histogram bucket
+MAX_LENGTH = 16
+# Tokens per chunk; small enough for the temporaries to stay in cache
+_CHUNK = 1 << 16
+
+
+def token_stats(tokens, text, vocab_size=None, unk_id=None, top_k=TOP_K, layout=None):
+    """Return a dict of statistics for tokens of text.
+
+    ``top`` lists (id, count) for the most frequent ids, ``lengths`` is
+    the histogram of token lengths in characters (the last bucket holds
+    MAX_LENGTH and longer) and ``line_density`` summarises tokens per
+    source line.  layout, if given, is a TokenLayout of tokens over text;
+    its line index is reused instead of searching the line starts again.
+    """
+    ids = tokens.ids
+    count = len(ids)
+    bins = max(vocab_size or 0, int(ids.max()) + 1 if count else 0)
+    frequencies = np.zeros(bins, dtype=np.int64)
+    histogram = np.zeros(MAX_LENGTH + 1, dtype=np.int64)
+    # Chunks of at least one count per bin, so adding up the counts costs less than making them
+    chunk = max(_CHUNK, bins)
+    for lo in range(0, count, chunk):
+        frequencies += np.bincount(ids[lo:lo + chunk], minlength=bins)
+        lengths = tokens.ends[lo:lo + chunk] - tokens.starts[lo:lo + chunk]
+        np.minimum(lengths, MAX_LENGTH, out=lengths)
+        histogram += np.bincount(lengths, minlength=MAX_LENGTH + 1)
+
+    k = min(top_k, np.count_nonzero(frequencies))
+    top = np.argpartition(frequencies, -k)[-k:] if k else np.empty(0, dtype=np.int64)
+    top = top[np.argsort(-frequencies[top], kind="stable")]
+
+    # There are far fewer lines than tokens, so search the line starts among the token
+    # starts.  Special tokens sit at offset 0; the trailing ones are counted on line 1
+    # with the leading ones so the starts searched stay sorted.
+    starts = tokens.starts
+    content = count
+    while content and starts[content - 1] == 0 and tokens.ends[content - 1] == 0:
+        content -= 1
+    if layout is not None:
+        # The layout searched the same starts; it only moved lines past the content to the end
+        firsts = np.minimum(layout.line_first[:-1], content)
+    else:
+        firsts = np.searchsorted(starts[:content], line_starts(text).astype(starts.dtype))
+    per_line = np.diff(firsts, append=content)
+    per_line[0] += count - content
+    densest = int(np.argmax(per_line))
+
+    used = int(np.count_nonzero(frequencies))
+    unknown = int(frequencies[unk_id]) if unk_id is not None and unk_id < len(frequencies) else 0
+    return {
+        "tokens": count,
+        "characters": len(text),
+        "chars_per_token": len(text) / count if count else 0.0,
+        "top": list(zip(top.tolist(), frequencies[top].tolist())),
+        "lengths": histogram.tolist(),
+        "unknown": unknown,
+        "unknown_rate": unknown / count if count else 0.0,
+        "distinct": used,
+        "vocab_coverage": used / vocab_size if vocab_size else 0.0,
+        "lines": len(per_line),
+        "line_density": {
+            "mean": float(per_line.mean()),
+            "p95": float(np.percentile(per_line, 95)),
+            "max": int(per_line[densest]),
+            "densest_line": densest + 1,
+        },
+    }
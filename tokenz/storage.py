@@ -0,0 +1,187 @@
+"""Binary token files.
+
+A ``.tokz`` file is a sequence of records, one per document::
+
+    b"TOKZ" | version u16 | reserved u16 | header length u32 | token count u64
+    header (UTF-8 JSON: model, path, ...) | zero padding to a 4-byte boundary
+    ids int32[count] | starts int32[count] | ends int32[count]
+    [text (UTF-8, header["text_bytes"] long) | zero padding to a 4-byte boundary]
+
+The padding after the text is left out when the text ends the file.
+
+All integers are little-endian.  The three columns have the same layout
+as a TokenBuffer, so a record can be mapped straight back into one.  A
+record may carry the text its offsets refer to; ``write_document`` and
+``read_document`` handle such self-contained single-record files.
+"""
+
+import json
+import mmap
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+from .buffer import TokenBuffer
+
+MAGIC = b"TOKZ"
+VERSION = 1
+RECORD_HEADER = struct.Struct("<4sHHIQ")
+COLUMN_DTYPE = np.dtype("<i4")
+# Characters encoded at a time when writing a document's text
+_TEXT_CHUNK = 1 << 22
+
+
+def _padding(size):
+    return -size % COLUMN_DTYPE.itemsize
+
+
+def _text_chunks(text):
+    # UTF-8 of a str or of anything providing iter_pieces (a MappedText), a piece at a time
+    if isinstance(text, str):
+        return (text[start:start + _TEXT_CHUNK].encode("utf-8") for start in range(0, len(text), _TEXT_CHUNK))
+    return (piece.encode("utf-8") for _, piece in text.iter_pieces(_TEXT_CHUNK))
+
+
+def _write_header(file, metadata, count):
+    header = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+    file.write(RECORD_HEADER.pack(MAGIC, VERSION, 0, len(header), count))
+    file.write(header)
+    file.write(b"\0" * _padding(RECORD_HEADER.size + len(header)))
+    return len(header)
+
+
+def _write_text(file, text, size, pad=True):
+    for chunk in _text_chunks(text):
+        file.write(chunk)
+    if pad:
+        file.write(b"\0" * _padding(size))
+
+
+def _column(column):
+    return memoryview(np.ascontiguousarray(column, dtype=COLUMN_DTYPE))
+
+
+def write_record(file, tokens, metadata=None, text=None, pad=True):
+    """Write tokens and their metadata (and the text, if given) to a binary file object as one record."""
+    metadata = dict(metadata or {})
+    if text is not None:
+        metadata["text_bytes"] = sum(len(chunk) for chunk in _text_chunks(text))
+    _write_header(file, metadata, len(tokens))
+    for column in (tokens.ids, tokens.starts, tokens.ends):
+        file.write(_column(column))
+    if text is not None:
+        _write_text(file, text, metadata["text_bytes"], pad)
+
+
+class RecordWriter:
+    """Write one record to a seekable binary file while its tokens are still being produced.
+
+    Blocks are appended with ``write``; ids go straight to the file and the
+    start and end columns are spilled to temporary files, so memory use stays
+    at one block.  ``close`` appends the spilled columns and the text and
+    fills in the token count.
+    """
+
+    def __init__(self, file, metadata=None, text=None):
+        self.file = file
+        self.metadata = dict(metadata or {})
+        self.text = text
+        if text is not None:
+            self.metadata["text_bytes"] = sum(len(chunk) for chunk in _text_chunks(text))
+        self.offset = file.tell()
+        self.header_size = _write_header(file, self.metadata, 0)
+        self.count = 0
+        self._spills = (tempfile.TemporaryFile(), tempfile.TemporaryFile())
+
+    def write(self, tokens):
+        self.file.write(_column(tokens.ids))
+        self._spills[0].write(_column(tokens.starts))
+        self._spills[1].write(_column(tokens.ends))
+        self.count += len(tokens)
+
+    def close(self):
+        try:
+            for spill in self._spills:
+                spill.seek(0)
+                shutil.copyfileobj(spill, self.file)
+            if self.text is not None:
+                _write_text(self.file, self.text, self.metadata["text_bytes"])
+            end = self.file.tell()
+            self.file.seek(self.offset)
+            self.file.write(RECORD_HEADER.pack(MAGIC, VERSION, 0, self.header_size, self.count))
+            self.file.seek(end)
+        finally:
+            for spill in self._spills:
+                spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read(data, offset):
+    if len(data) - offset < RECORD_HEADER.size:
+        raise ValueError(f"truncated TOKZ record at offset {offset}")
+    magic, version, _, header_size, count = RECORD_HEADER.unpack_from(data, offset)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a TOKZ v{VERSION} record at offset {offset}")
+    start = offset + RECORD_HEADER.size
+    metadata = json.loads(bytes(data[start:start + header_size]).decode("utf-8"))
+    start += header_size + _padding(RECORD_HEADER.size + header_size)
+    columns = np.frombuffer(data, dtype=COLUMN_DTYPE, count=3 * count, offset=start).reshape(3, count)
+    text_start = start + columns.nbytes
+    text_bytes = metadata.get("text_bytes", 0)
+    return metadata, TokenBuffer._view(columns), text_start, text_start + text_bytes + _padding(text_bytes)
+
+
+def read_record(data, offset=0):
+    """Read the record at offset of a bytes-like object (e.g. an mmap).
+
+    Returns (metadata, tokens, next_offset).  The TokenBuffer is a view of
+    data, not a copy, so a mapped file stays mapped while it is in use.
+    """
+    metadata, tokens, _, next_offset = _read(data, offset)
+    return metadata, tokens, next_offset
+
+
+def iter_records(data):
+    """Yield (metadata, tokens) for every record in data."""
+    offset = 0
+    while offset < len(data):
+        metadata, tokens, offset = read_record(data, offset)
+        yield metadata, tokens
+
+
+def write_document(path, tokens, text, metadata=None):
+    """Save tokens together with their text as a single-record file."""
+    with open(path, 'wb') as file:
+        # The text runs to the end of the file, so it can be mapped in place
+        write_record(file, tokens, metadata, text, pad=False)
+
+
+def read_document(path, mapped_bytes=None):
+    """Map a file written by ``write_document``; returns (metadata, tokens, text).
+
+    The tokens are a view of the mapping.  Texts of at least mapped_bytes
+    bytes are returned as a MappedText over the same file rather than
+    decoded; text is None if the record was written without it.
+    """
+    from .mapped import MappedText
+
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        metadata, tokens, text_start, _ = _read(data, 0)
+    except Exception:
+        data.close()  # Nothing views it yet
+        raise
+    text_bytes = metadata.get("text_bytes")
+    if text_bytes is None:
+        return metadata, tokens, None
+    if mapped_bytes is not None and text_bytes >= mapped_bytes and text_start + text_bytes == len(data):
+        return metadata, tokens, MappedText(path, text_start)
+    return metadata, tokens, str(memoryview(data)[text_start:text_start + text_bytes], "utf-8")
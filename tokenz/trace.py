@@ -0,0 +1,136 @@
+"""Opt-in timing of the tokenization pipeline.
+
+Spans are recorded by the module-level ``tracer`` while it is enabled:
+``with tracer.span(name)`` around a block, or ``@traced(name)`` on a
+function.  Disabled, a span is one attribute check and a shared no-op
+context, so the instrumentation stays in place at no measurable cost.
+
+Set ``TOKENZ_TRACE=trace.json`` to enable tracing at import and write the
+spans as a Chrome trace-event file at exit (open it in ``chrome://tracing``
+or Perfetto).  Only the latest ``MAX_EVENTS`` spans are kept for the file,
+and none without one.  ``summary()`` gives per-span counts and timings for
+display.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Spans kept for the trace file, the latest ones (about 40 MB in all); totals keep counting past it
+MAX_EVENTS = 200_000
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.category, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+    def set(self, **args):
+        """Attach values known only inside the span, e.g. how many tokens it produced."""
+        self.args.update(args)
+
+
+class Tracer:
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = bool(path)
+        self.events = deque(maxlen=MAX_EVENTS)  # (name, category, thread, start_ns, end_ns, args)
+        self.totals = {}  # name -> [count, total_ns, max_ns]
+        self.threads = {}
+        self.origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def span(self, name, category="app", **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def record(self, name, category, start, end, args=None):
+        """Record a finished span from perf_counter_ns() start and end times."""
+        thread = threading.get_native_id()
+        with self._lock:
+            total = self.totals.get(name)
+            if total is None:
+                total = self.totals[name] = [0, 0, 0]
+            total[0] += 1
+            total[1] += end - start
+            total[2] = max(total[2], end - start)
+            if thread not in self.threads:
+                self.threads[thread] = threading.current_thread().name
+            if self.path:
+                self.events.append((name, category, thread, start, end, args))
+
+    def summary(self):
+        """Return [(name, count, total_ms, mean_ms, max_ms)], most total time first."""
+        with self._lock:
+            totals = [(name, count, total / 1e6, total / count / 1e6, peak / 1e6)
+                      for name, (count, total, peak) in self.totals.items()]
+        return sorted(totals, key=lambda row: row[2], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self.totals = {}
+
+    def write(self, path=None):
+        """Write the recorded spans as Chrome trace-event JSON."""
+        pid = os.getpid()
+        with self._lock:
+            names = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread, "args": {"name": name}}
+                     for thread, name in self.threads.items()]
+            events = names + [{"name": name, "cat": category, "ph": "X", "pid": pid, "tid": thread,
+                               "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000, "args": args or {}}
+                              for name, category, thread, start, end, args in self.events]
+        with open(path or self.path, 'w') as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+tracer = Tracer(os.environ.get("TOKENZ_TRACE"))
+if tracer.path:
+    atexit.register(tracer.write)
+
+
+def traced(name, category="app"):
+    """Decorator recording each call of the function as a span."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with tracer.span(name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,49 @@
+"""Convert between str offsets and Qt document positions.
+
+A Python str counts code points, while Qt (QTextCursor, contentsChange)
+counts UTF-16 units, in which a character outside the Basic Multilingual
+Plane (most emoji) takes two.  Only those astral characters need
+remembering: a position moves by the number of them before it, found with
+one binary search.  Text without any converts for free.
+"""
+
+import re
+
+import numpy as np
+
+_ASTRAL = re.compile("[\U00010000-\U0010ffff]")
+
+
+class Utf16Offsets:
+    def __init__(self, text):
+        if text.isascii() or _ASTRAL.search(text) is None:
+            self.astral = None
+            return
+        codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        # Offsets of the astral characters, in code points and in UTF-16 units
+        self.astral = np.flatnonzero(codes > 0xFFFF)
+        self.astral_units = self.astral + np.arange(len(self.astral))
+
+    def to_utf16(self, offsets):
+        """Qt positions of str offsets (an int or an array)."""
+        if self.astral is None:
+            return offsets
+        shifted = offsets + np.searchsorted(self.astral, offsets)
+        return int(shifted) if np.ndim(shifted) == 0 else shifted
+
+    def from_utf16(self, positions):
+        """str offsets of Qt positions; a position inside a surrogate pair maps to its character."""
+        if self.astral is None:
+            return positions
+        shifted = positions - np.searchsorted(self.astral_units, positions)
+        return int(shifted) if np.ndim(shifted) == 0 else shifted
+
+
+def edit_from_utf16(old_text, new_text, position, removed, added):
+    """Return a contentsChange (position, removed, added) edit in str offsets of old_text and new_text."""
+    offsets = Utf16Offsets(new_text)
+    start = offsets.from_utf16(position)
+    end = offsets.from_utf16(position + added) if added else start
+    # The text before position is the same in both, so start is an offset of old_text too
+    removed_end = Utf16Offsets(old_text).from_utf16(position + removed) if removed else start
+    return start, removed_end - start, end - start